@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from api.views import (IngredientViewSet, RecipeViewSet, TagViewSet,
+                       resolve_short_link)
+
+# Потоки для ORM под ASGI. Django 3.2 выполняет синхронные представления
+# в одном потоке на все запросы; здесь запросы к БД идут параллельно,
+# а медленные клиенты ждут в цикле событий, не занимая потоки.
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASGI_THREADS, thread_name_prefix='asgi-views'
+)
+
+
+def in_thread_pool(view):
+    """
+    Асинхронная обертка синхронного представления: ORM, сериализация
+    и рендеринг ответа - в пуле потоков. Соединение с БД у потока свое
+    и проверяется до и после запроса, как в обработчике WSGI.
+    """
+
+    def call(request, *args, **kwargs):
+        close_old_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    run = sync_to_async(call, thread_sensitive=False, executor=executor)
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await run(request, *args, **kwargs)
+
+    return async_view
+
+
+tag_list = in_thread_pool(TagViewSet.as_view(
+    {'get': 'list'}, basename='tags', detail=False
+))
+ingredient_list = in_thread_pool(IngredientViewSet.as_view(
+    {'get': 'list'}, basename='ingredients', detail=False
+))
+recipe_list = in_thread_pool(RecipeViewSet.as_view(
+    {'get': 'list', 'post': 'create'}, basename='recipes', detail=False
+))
+recipe_detail = in_thread_pool(RecipeViewSet.as_view(
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+     'delete': 'destroy'},
+    basename='recipes', detail=True
+))
+short_link = in_thread_pool(resolve_short_link)
@@ -0,0 +1,92 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.db_routers import primary
+
+
+def token_cache_key(key):
+    """Ключ кэша токена: в кэше хранится хеш, а не сам токен."""
+    return f'auth-token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def invalidate_token(key):
+    """Сброс закэшированного токена: выход, смена пароля, блокировка."""
+    cache.delete(token_cache_key(key))
+
+
+def invalidate_user_tokens(user_id):
+    """Сброс кэша всех токенов пользователя."""
+    for key in Token.objects.filter(user_id=user_id).values_list(
+        'key', flat=True
+    ):
+        invalidate_token(key)
+
+
+def cached_user_fields():
+    """
+    Поля пользователя в кэше токенов: без хеша пароля и без полей,
+    которые меняются в обход save() (счетчики, отметка о копии
+    аватара). Они отложены и не перезапишутся старым значением.
+    """
+    return [
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.primary_key
+        or field.editable and field.attname != 'password'
+    ]
+
+
+def dump_token(token):
+    """Токен и пользователь для кэша, без хеша пароля."""
+    user = token.user
+    return {
+        'created': token.created,
+        'user': [getattr(user, name) for name in cached_user_fields()],
+    }
+
+
+def load_token(key, cached):
+    """
+    Токен из кэша. Пароль и поля вне кэша у пользователя отложены:
+    они читаются из БД при обращении, а save() их не перезаписывает.
+    """
+    user = get_user_model().from_db(
+        DEFAULT_DB_ALIAS, cached_user_fields(), cached['user']
+    )
+    token = Token.from_db(
+        DEFAULT_DB_ALIAS, ['key', 'user_id', 'created'],
+        [key, user.pk, cached['created']]
+    )
+    token.user = user
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с токеном и пользователем в кэше Django:
+    без запроса к БД на каждый авторизованный вызов API.
+    Кэш сбрасывается сигналами при удалении токена и сохранении
+    пользователя, время жизни - AUTH_TOKEN_CACHE_TIMEOUT.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is None:
+            # Отставшая реплика вернула бы в кэш отозванный токен
+            with primary():
+                user, token = super().authenticate_credentials(key)
+            cache.set(
+                cache_key, dump_token(token), settings.AUTH_TOKEN_CACHE_TIMEOUT
+            )
+            return user, token
+        token = load_token(key, cached)
+        if not token.user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        return token.user, token
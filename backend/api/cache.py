@@ -0,0 +1,163 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from api.db_routers import primary
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
+from users.models import Subscription
+
+# Версия ленты рецептов без фильтров по автору и тегам
+RECIPE_FEED_VERSION = 'recipe-feed'
+
+RELATIONS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'shopping_cart': (ShoppingCart, 'recipe_id'),
+    'subscriptions': (Subscription, 'author_id'),
+}
+
+
+def relation_key(user_id, relation, version):
+    """Ключ кэша множества связей пользователя в данной версии."""
+    return f'relations:{relation}:{user_id}:{version}'
+
+
+def relation_set_version(user_id, relation):
+    """Имя версии одного множества связей пользователя."""
+    return f'relations:{user_id}:{relation}'
+
+
+def get_relation_ids(user, relation):
+    """
+    Множество id рецептов (избранное, корзина) или авторов (подписки)
+    пользователя. При промахе загружается из БД одним запросом.
+
+    Версия читается до запроса к БД и входит в ключ: если запись
+    сбросит версию, пока идет запрос, устаревшее множество сохранится
+    под старым ключом, который уже никто не прочитает.
+    """
+    version = get_version(relation_set_version(user.id, relation))
+    key = relation_key(user.id, relation, version)
+    ids = cache.get(key)
+    if ids is None:
+        model, field = RELATIONS[relation]
+        with primary():
+            ids = frozenset(
+                model.objects.filter(user=user).values_list(field, flat=True)
+            )
+        cache.set(key, ids, settings.RELATIONS_CACHE_TIMEOUT)
+    return ids
+
+
+def invalidate_relation(user_id, relation):
+    """Сброс кэша связей пользователя после записи."""
+    bump_versions(
+        (relation_set_version(user_id, relation), f'relations:{user_id}')
+    )
+
+
+def relation_version(user_id):
+    """Версия всех связей пользователя (для ETag персональных ответов)."""
+    return get_version(f'relations:{user_id}')
+
+
+def version_key(name):
+    """Ключ счетчика изменений таблицы или ресурса."""
+    return f'version:{name}'
+
+
+def get_version(name):
+    """
+    Текущая версия ресурса. Начальное значение - время в наносекундах,
+    чтобы после потери кэша версии не повторялись.
+    """
+    return cache.get_or_set(version_key(name), time.time_ns, None)
+
+
+def bump_version(name):
+    """Отметка об изменении ресурса."""
+    cache.set(version_key(name), time.time_ns(), None)
+
+
+def get_versions(names):
+    """Текущие версии нескольких ресурсов одним обращением к кэшу."""
+    keys = {version_key(name): name for name in names}
+    found = cache.get_many(keys)
+    return [
+        found[key] if key in found else get_version(name)
+        for key, name in keys.items()
+    ]
+
+
+def bump_versions(names):
+    """Отметка об изменении нескольких ресурсов."""
+    now = time.time_ns()
+    cache.set_many({version_key(name): now for name in names}, None)
+
+
+def recipe_version(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def author_recipes_version(author_id):
+    return f'recipe-author:{author_id}'
+
+
+def tag_recipes_version(slug):
+    return f'recipe-tag:{slug}'
+
+
+def recipe_response_versions(recipe_id, author_id, tag_slugs=()):
+    """
+    Версии ответов с одним рецептом по данным в памяти, без запросов:
+    карточка, списки автора и тегов, лента.
+    """
+    names = {
+        RECIPE_FEED_VERSION, recipe_version(recipe_id),
+        author_recipes_version(author_id),
+    }
+    names.update(tag_recipes_version(slug) for slug in tag_slugs)
+    return names
+
+
+def recipe_dependencies(recipe_ids):
+    """
+    Версии ответов, которые меняются вместе с рецептами: карточки,
+    списки их авторов и тегов, общая лента.
+    """
+    names = {RECIPE_FEED_VERSION}
+    names.update(recipe_version(pk) for pk in recipe_ids)
+    names.update(
+        author_recipes_version(author_id)
+        for author_id in Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list('author_id', flat=True)
+    )
+    names.update(
+        tag_recipes_version(slug)
+        for slug in Tag.objects.filter(
+            recipes__in=recipe_ids
+        ).values_list('slug', flat=True)
+    )
+    return names
+
+
+def author_dependencies(author_id):
+    """
+    Версии ответов, в которых автор выводится вместе с рецептами:
+    карточки, списки автора и тегов его рецептов, лента.
+    """
+    recipe_ids = list(Recipe.objects.filter(
+        author_id=author_id
+    ).values_list('pk', flat=True))
+    if not recipe_ids:
+        return set()
+    names = {RECIPE_FEED_VERSION, author_recipes_version(author_id)}
+    names.update(recipe_version(pk) for pk in recipe_ids)
+    names.update(
+        tag_recipes_version(slug)
+        for slug in Tag.objects.filter(
+            recipes__author_id=author_id
+        ).values_list('slug', flat=True).distinct()
+    )
+    return names
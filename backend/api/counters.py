@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+# Источник записей -> (модель со счетчиками, поле связи, поля счетчиков)
+COUNTERS = {
+    Favorite: (Recipe, 'recipe', ('favorites_count', 'popularity')),
+    ShoppingCart: (Recipe, 'recipe', ('shopping_cart_count', 'popularity')),
+    Recipe: (User, 'author', ('recipes_count',)),
+    Subscription: (User, 'author', ('followers_count',)),
+}
+
+
+def change_counter(source, instance, delta):
+    """
+    Атомарное изменение счетчиков через F(), без чтения значений.
+    При уменьшении каждый счетчик отдельно не опускается ниже нуля.
+    """
+    target, field, counters = COUNTERS[source]
+    target.objects.filter(pk=getattr(instance, f'{field}_id')).update(**{
+        counter: (
+            F(counter) + delta if delta > 0
+            else Greatest(F(counter) + delta, 0)
+        )
+        for counter in counters
+    })
+
+
+def counter_sources():
+    """Счетчик (модель, поле) -> источники записей, из которых он состоит."""
+    sources = defaultdict(list)
+    for source, (target, field, counters) in COUNTERS.items():
+        for counter in counters:
+            sources[target, counter].append((source, field))
+    return sources
+
+
+def count_subquery(source, field):
+    """Подзапрос с фактическим числом записей источника."""
+    return Coalesce(Subquery(
+        source.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def recount(target, counter, sources):
+    """Исправление расхождений счетчика, возвращает число исправленных."""
+    actual = sum(
+        (count_subquery(source, field) for source, field in sources[1:]),
+        count_subquery(*sources[0])
+    )
+    return target.objects.exclude(**{counter: actual}).update(
+        **{counter: actual}
+    )
@@ -0,0 +1,101 @@
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.authentication import get_authorization_header
+
+REPLICA_DB_ALIAS = 'replica'
+# Cookie закрепления за основной БД после записи
+PIN_COOKIE = 'primary_pin'
+
+# Чтение с реплики разрешено: безопасный запрос (GET, HEAD, OPTIONS)
+read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+@contextmanager
+def primary():
+    """
+    Чтение с основной БД внутри блока. Нужно там, где результат
+    кэшируется до явного сброса: отставшая реплика вернула бы
+    в кэш только что удаленные или измененные данные.
+    """
+    token = read_from_replica.set(False)
+    try:
+        yield
+    finally:
+        read_from_replica.reset(token)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def pin_cache_key(request):
+    """
+    Ключ закрепления по хешу токена: для клиентов без cookie.
+    Токен не проверяется - ключ лишь выбирает БД для чтения.
+    """
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != b'token':
+        return None
+    return f'replica-pin:{hashlib.sha256(auth[1]).hexdigest()}'
+
+
+def is_pinned(request):
+    """Недавно писавший клиент читает с основной БД."""
+    if PIN_COOKIE in request.COOKIES:
+        return True
+    key = pin_cache_key(request)
+    return key is not None and cache.get(key) is not None
+
+
+def pin_to_primary(request, response):
+    """
+    Закрепление клиента за основной БД на REPLICA_PIN_SECONDS после
+    небезопасного запроса: он сразу видит свой рецепт, избранное
+    и подписки, даже если реплика отстает.
+    """
+    seconds = settings.REPLICA_PIN_SECONDS
+    response.set_cookie(
+        PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax'
+    )
+    key = pin_cache_key(request)
+    if key is not None:
+        cache.set(key, True, seconds)
+
+
+class PrimaryReplicaRouter:
+    """
+    Запись и чтение в небезопасных запросах - основная БД,
+    чтение в безопасных запросах - реплика, если она настроена.
+    Команды и фоновые задачи всегда работают с основной БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        if read_from_replica.get() and replica_configured():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика - копия основной БД, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def check_connections(**kwargs):
+    """
+    Проверка постоянных соединений в начале запроса: разорванное
+    (рестарт PostgreSQL, PgBouncer) закрывается и открывается заново
+    при первом запросе к БД, а не завершает запрос ошибкой.
+    """
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
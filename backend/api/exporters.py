@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import os
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+SHOPPING_LIST_TITLE = 'Необходимо купить:'
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+PDF_CHUNK_SIZE = 64 * 1024
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def export_txt(items):
+    yield f'{SHOPPING_LIST_TITLE}\n'
+    for name, unit, amount in items:
+        yield f'{name} - {amount} {unit}\n'
+
+
+def export_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for name, unit, amount in items:
+        yield writer.writerow((name, amount, unit))
+
+
+def export_json(items):
+    yield '['
+    separator = ''
+    for name, unit, amount in items:
+        yield separator + json.dumps(
+            {'name': name, 'amount': amount, 'measurement_unit': unit},
+            ensure_ascii=False
+        )
+        separator = ','
+    yield ']'
+
+
+def get_pdf_font():
+    """Шрифт с кириллицей, если он есть в системе."""
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    if not os.path.exists(settings.PDF_FONT_PATH):
+        return 'Helvetica'
+    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, settings.PDF_FONT_PATH))
+    return PDF_FONT_NAME
+
+
+def export_pdf(items):
+    """
+    PDF собирается постранично в буфер и отдается частями:
+    формат не позволяет писать документ в поток до его завершения.
+    """
+    buffer = io.BytesIO()
+    font = get_pdf_font()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    _, height = A4
+    top = height - PDF_MARGIN
+    line_height = PDF_FONT_SIZE * 1.5
+    pdf.setFont(font, PDF_FONT_SIZE)
+    pdf.drawString(PDF_MARGIN, top, SHOPPING_LIST_TITLE)
+    y = top - line_height
+    for name, unit, amount in items:
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(font, PDF_FONT_SIZE)
+            y = top
+        pdf.drawString(PDF_MARGIN, y, f'{name} - {amount} {unit}')
+        y -= line_height
+    pdf.save()
+    buffer.seek(0)
+    while True:
+        chunk = buffer.read(PDF_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+EXPORT_FORMATS = {
+    'txt': (export_txt, 'text/plain; charset=utf-8'),
+    'csv': (export_csv, 'text/csv; charset=utf-8'),
+    'json': (export_json, 'application/json'),
+    'pdf': (export_pdf, 'application/pdf'),
+}
@@ -0,0 +1,142 @@
+import time
+from collections import defaultdict
+
+from django.db.models import Exists, OuterRef
+
+from api.images import stored_rendition_url
+from api.metrics import current_metrics
+from recipes.models import Recipe, RecipeIngredient
+from users.models import Subscription, User
+
+RECIPE_FIELDS = (
+    'id', 'author_id', 'name', 'image', 'rendered_image', 'text',
+    'cooking_time', 'is_favorited', 'is_in_shopping_cart',
+)
+AUTHOR_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name', 'avatar',
+    'rendered_avatar',
+)
+
+
+def recipe_rows(queryset):
+    """
+    Рецепты словарями .values() без prefetch_related.
+    Поля сортировки остаются в строке: по ним строится курсор.
+    """
+    fields = list(RECIPE_FIELDS)
+    for field in queryset.query.order_by:
+        if isinstance(field, str):
+            field = field.lstrip('-')
+            if field not in fields:
+                fields.append(field)
+    return queryset.prefetch_related(None).values(*fields)
+
+
+class RecipeReadSerializer:
+    """
+    Чтение рецептов без полей DRF: ответ собирается из строк
+    recipe_rows и трех запросов за тегами, ингредиентами и авторами.
+    JSON совпадает с RecipeSerializer поле в поле.
+    """
+
+    def __init__(self, rows, request=None, rendition='detail'):
+        self.rows = list(rows)
+        self.request = request
+        self.rendition = rendition
+        self.user = getattr(request, 'user', None)
+        self.authenticated = bool(self.user and self.user.is_authenticated)
+        self.image_storage = Recipe._meta.get_field('image').storage
+        self.avatar_storage = User._meta.get_field('avatar').storage
+
+    def load(self):
+        """Теги, ингредиенты и авторы страницы по рецептам и по id."""
+        ids = [row['id'] for row in self.rows]
+        self.tags = defaultdict(list)
+        recipe_tags = Recipe.tags.through.objects.filter(recipe_id__in=ids)
+        for recipe_id, tag_id, name, slug in recipe_tags.order_by(
+            'tag_id'
+        ).values_list('recipe_id', 'tag_id', 'tag__name', 'tag__slug'):
+            self.tags[recipe_id].append(
+                {'id': tag_id, 'name': name, 'slug': slug}
+            )
+        self.ingredients = defaultdict(list)
+        for recipe_id, ingredient_id, name, amount, unit in (
+            RecipeIngredient.objects.filter(recipe_id__in=ids).values_list(
+                'recipe_id', 'ingredient_id', 'ingredient__name', 'amount',
+                'ingredient__measurement_unit'
+            )
+        ):
+            self.ingredients[recipe_id].append({
+                'id': ingredient_id,
+                'name': name,
+                'amount': amount,
+                'measurement_unit': unit,
+            })
+        authors = User.objects.filter(
+            id__in={row['author_id'] for row in self.rows}
+        ).order_by()
+        if self.authenticated:
+            authors = authors.annotate(is_subscribed=Exists(
+                Subscription.objects.filter(
+                    user=self.user, author=OuterRef('pk')
+                )
+            )).values(*AUTHOR_FIELDS, 'is_subscribed')
+        else:
+            authors = authors.values(*AUTHOR_FIELDS)
+        self.authors = {
+            author['id']: self.to_author(author) for author in authors
+        }
+
+    def image_url(self, storage, name, rendered, rendition):
+        if not name:
+            return None
+        url = stored_rendition_url(storage, name, rendition, rendered == name)
+        if self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
+
+    def to_author(self, row):
+        return {
+            'email': row['email'],
+            'id': row['id'],
+            'username': row['username'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'is_subscribed': bool(row.get('is_subscribed', False)),
+            'avatar': self.image_url(
+                self.avatar_storage, row['avatar'], row['rendered_avatar'],
+                'avatar'
+            ),
+        }
+
+    def to_representation(self, row):
+        recipe_id = row['id']
+        return {
+            'id': recipe_id,
+            'tags': self.tags[recipe_id],
+            'author': self.authors[row['author_id']],
+            'ingredients': self.ingredients[recipe_id],
+            'is_favorited': self.authenticated and bool(row['is_favorited']),
+            'is_in_shopping_cart': (
+                self.authenticated and bool(row['is_in_shopping_cart'])
+            ),
+            'name': row['name'],
+            'image': self.image_url(
+                self.image_storage, row['image'], row['rendered_image'],
+                self.rendition
+            ),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+
+    @property
+    def data(self):
+        if not self.rows:
+            return []
+        self.load()
+        started = time.perf_counter()
+        data = [self.to_representation(row) for row in self.rows]
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.serializer_time += time.perf_counter() - started
+        return data
@@ -0,0 +1,135 @@
+import binascii
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+
+from api.images import AVATAR_RENDITIONS, rendition_url
+
+BASE64_MARKER = ';base64,'
+# Размер части base64-строки, декодируемой за один шаг
+BASE64_CHUNK_SIZE = 64 * 1024
+# Переносы строк и пробелы внутри base64 (например, по 76 символов)
+BASE64_WHITESPACE = ' \t\r\n'
+
+
+class Base64UploadedFile(TemporaryUploadedFile):
+    """
+    Временный файл декодированного изображения.
+    Хранилище перемещает его по пути, закрытие это учитывает.
+    """
+
+    def __del__(self):
+        self.close()
+
+
+def decode_base64_file(data):
+    """
+    Декодирование data URI по частям во временный файл на диске.
+    Размер проверяется до декодирования, в памяти - только одна часть.
+    Пробелы и переносы строк пропускаются; в декодер идут части
+    длиной, кратной 4, остаток переносится в следующую часть.
+    """
+    header, separator, _ = data[:256].partition(BASE64_MARKER)
+    if not header.startswith('data:') or not separator:
+        raise serializers.ValidationError('Ожидается изображение в base64.')
+    content_type = header[len('data:'):]
+    extension = content_type.split('/')[-1] or 'bin'
+    start = len(header) + len(BASE64_MARKER)
+    length = len(data) - start - sum(
+        data.count(char, start) for char in BASE64_WHITESPACE
+    )
+    size = length * 3 // 4 - data.rstrip(BASE64_WHITESPACE)[-2:].count('=')
+    if size > settings.MAX_UPLOAD_IMAGE_BYTES:
+        raise serializers.ValidationError(
+            'Размер изображения превышает '
+            f'{settings.MAX_UPLOAD_IMAGE_BYTES} байт.'
+        )
+    upload = Base64UploadedFile(
+        f'{uuid.uuid4()}.{extension}', content_type, size, None
+    )
+    pending = ''
+    try:
+        for offset in range(start, len(data), BASE64_CHUNK_SIZE):
+            part = pending + ''.join(
+                data[offset:offset + BASE64_CHUNK_SIZE].split()
+            )
+            cut = len(part) - len(part) % 4
+            upload.write(binascii.a2b_base64(part[:cut]))
+            pending = part[cut:]
+        if pending:
+            raise binascii.Error('Неполная группа base64')
+    except binascii.Error:
+        upload.close()
+        raise serializers.ValidationError('Некорректная строка base64.')
+    upload.size = upload.tell()
+    upload.seek(0)
+    return upload
+
+
+def check_image_limits(upload):
+    """Ограничения по размеру файла и числу пикселей (по заголовку)."""
+    if upload.size > settings.MAX_UPLOAD_IMAGE_BYTES:
+        raise serializers.ValidationError(
+            'Размер изображения превышает '
+            f'{settings.MAX_UPLOAD_IMAGE_BYTES} байт.'
+        )
+    try:
+        with Image.open(upload) as image:
+            width, height = image.size
+    except Exception:
+        raise serializers.ValidationError(
+            'Загрузите корректное изображение.'
+        )
+    finally:
+        upload.seek(0)
+    if width * height > settings.MAX_UPLOAD_IMAGE_PIXELS:
+        raise serializers.ValidationError(
+            'Изображение больше '
+            f'{settings.MAX_UPLOAD_IMAGE_PIXELS} пикселей.'
+        )
+
+
+class Base64ImageField(serializers.ImageField):
+    """
+    Изображение строкой base64 (data URI) в JSON
+    или файлом в multipart/form-data.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            if data.startswith('http'):
+                raise SkipField()
+            data = decode_base64_file(data)
+        if hasattr(data, 'size') and hasattr(data, 'seek'):
+            check_image_limits(data)
+        return super().to_internal_value(data)
+
+
+class RenditionImageField(Base64ImageField):
+    """
+    Изображение в base64 на вход, на выход - URL уменьшенной копии.
+    Копию фото рецепта можно переопределить ключом image_rendition
+    в контексте.
+    """
+
+    def __init__(self, *args, rendition=None, **kwargs):
+        self.rendition = rendition
+        super().__init__(*args, **kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        rendition = self.rendition
+        if rendition not in AVATAR_RENDITIONS:
+            # image_rendition выбирает копию фото рецепта, аватаров
+            # вложенных авторов он не касается.
+            rendition = self.context.get('image_rendition', rendition)
+        url = rendition_url(value, rendition) if rendition else value.url
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
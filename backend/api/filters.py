@@ -1,14 +1,18 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import (AllValuesMultipleFilter,
-                                           BooleanFilter, FilterSet,
+                                           BooleanFilter, CharFilter,
+                                           ChoiceFilter, FilterSet,
                                            ModelMultipleChoiceFilter)
-from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe
+from api.search import search_recipes
+from recipes.models import Favorite, Recipe, ShoppingCart
 from users.models import User
 
-
-class IngredientFilter(SearchFilter):
-    search_param = 'name'
+# Порядок выдачи рецептов; у каждого варианта есть индекс в модели
+RECIPE_ORDERINGS = {
+    'popular': ('-popularity', '-id'),
+    'trending': ('-trending_score', '-id'),
+}
 
 
 class RecipeFilter(FilterSet):
@@ -27,22 +31,49 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = BooleanFilter(
         method='filter_is_in_shopping_cart',
     )
+    search = CharFilter(
+        method='filter_search',
+    )
+    ordering = ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_ORDERINGS],
+        method='filter_ordering',
+    )
+
+    def filter_user_relation(self, queryset, name, model):
+        """
+        Рецепты из связи пользователя. Флаг-аннотация есть только у
+        чтения, при записи фильтр строится подзапросом Exists.
+        """
+        if name in queryset.query.annotations:
+            return queryset.filter(**{name: True})
+        return queryset.filter(Exists(model.objects.filter(
+            user=self.request.user, recipe=OuterRef('pk')
+        )))
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(favorites__user=self.request.user)
+            return self.filter_user_relation(queryset, name, Favorite)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(shopping_cart__user=self.request.user)
+            return self.filter_user_relation(queryset, name, ShoppingCart)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск, по умолчанию - по релевантности."""
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
     class Meta:
         model = Recipe
         fields = [
             'author',
             'is_favorited',
             'is_in_shopping_cart',
+            'search',
+            'ordering',
             'tags'
         ]
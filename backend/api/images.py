@@ -0,0 +1,141 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Максимальные размеры уменьшенных копий (ширина, высота)
+RENDITIONS = {
+    'card': (480, 480),
+    'detail': (1200, 1200),
+    'avatar': (50, 50),
+}
+RECIPE_RENDITIONS = ('card', 'detail')
+AVATAR_RENDITIONS = ('avatar',)
+RENDITION_FORMAT = 'WEBP'
+RENDITION_EXTENSION = 'webp'
+RENDITION_QUALITY = 80
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS, thread_name_prefix='renditions'
+)
+
+# Копии файла готовы и отмечены в модели: sender - модель, pk - запись
+renditions_ready = Signal()
+
+
+def rendition_name(name, rendition):
+    """Путь уменьшенной копии в хранилище рядом с оригиналом."""
+    stem, _ = os.path.splitext(name)
+    return f'renditions/{stem}_{rendition}.{RENDITION_EXTENSION}'
+
+
+def rendered_field(field_name):
+    """Поле модели с именем файла, для которого готовы копии."""
+    return f'rendered_{field_name}'
+
+
+def stored_rendition_url(storage, name, rendition, ready):
+    """
+    URL копии файла name в storage, если копии отмечены готовыми,
+    иначе оригинала. Хранилище не опрашивается.
+    """
+    if ready:
+        return storage.url(rendition_name(name, rendition))
+    return storage.url(name)
+
+
+def renditions_are_ready(field_file):
+    """Копии готовы для текущего файла, а не для прежнего."""
+    return getattr(
+        field_file.instance, rendered_field(field_file.field.name), ''
+    ) == field_file.name
+
+
+def rendition_url(field_file, rendition):
+    """URL готовой уменьшенной копии, пока ее нет - URL оригинала."""
+    return stored_rendition_url(
+        field_file.storage, field_file.name, rendition,
+        renditions_are_ready(field_file)
+    )
+
+
+def missing_renditions(storage, name, renditions):
+    """Копии, которых еще нет в хранилище."""
+    return [
+        rendition for rendition in renditions
+        if not storage.exists(rendition_name(name, rendition))
+    ]
+
+
+def render(storage, name, renditions):
+    """Кодирование уменьшенных копий изображения."""
+    with storage.open(name) as source, Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        for rendition in renditions:
+            copy = image.copy()
+            copy.thumbnail(RENDITIONS[rendition], Image.LANCZOS)
+            buffer = io.BytesIO()
+            copy.save(
+                buffer, RENDITION_FORMAT, quality=RENDITION_QUALITY,
+                method=6
+            )
+            target = rendition_name(name, rendition)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def mark_rendered(model, pk, field_name, name):
+    """
+    Отметка о готовых копиях, если файл записи не сменился, пока
+    они кодировались. Сигналы post_save не отправляются.
+    """
+    updated = model._default_manager.filter(
+        pk=pk, **{field_name: name}
+    ).update(**{rendered_field(field_name): name})
+    if updated:
+        renditions_ready.send(sender=model, pk=pk)
+    return updated
+
+
+def build_renditions(model, pk, field_name, storage, name, renditions):
+    """Кодирование недостающих копий и отметка о готовности."""
+    missing = missing_renditions(storage, name, renditions)
+    if missing:
+        render(storage, name, missing)
+    mark_rendered(model, pk, field_name, name)
+    return missing
+
+
+def build_safely(*args):
+    """
+    Ошибка кодирования не должна теряться в пуле потоков.
+    Соединения с БД потока закрываются после задачи.
+    """
+    try:
+        build_renditions(*args)
+    except Exception:
+        logger.exception('Не удалось подготовить копии %s', args[4])
+    finally:
+        connections.close_all()
+
+
+def schedule_renditions(field_file, renditions):
+    """Кодирование копий в пуле потоков, вне запроса."""
+    if not field_file or renditions_are_ready(field_file):
+        return
+    instance = field_file.instance
+    executor.submit(
+        build_safely, type(instance), instance.pk, field_file.field.name,
+        field_file.storage, field_file.name, renditions
+    )
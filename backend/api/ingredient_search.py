@@ -0,0 +1,103 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from api.cache import get_version
+from api.db_routers import primary
+from recipes.models import Ingredient
+
+TRIGRAM_LENGTH = 3
+MIN_SUBSTRING_LENGTH = 2
+
+
+def normalize(value):
+    """Приведение строки к нижнему регистру с заменой ё на е."""
+    return value.lower().replace('ё', 'е')
+
+
+def trigrams(value):
+    return {
+        value[i:i + TRIGRAM_LENGTH]
+        for i in range(len(value) - TRIGRAM_LENGTH + 1)
+    }
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+    Перестраивается при изменении версии 'ingredients' в кэше.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._snapshot = None
+
+    def _build(self):
+        rows = sorted(
+            (normalize(name), pk, name, unit)
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        items = [
+            {'id': pk, 'name': name, 'measurement_unit': unit}
+            for _, pk, name, unit in rows
+        ]
+        keys = [row[0] for row in rows]
+        index = defaultdict(list)
+        for position, key in enumerate(keys):
+            for gram in trigrams(key):
+                index[gram].append(position)
+        by_id = sorted(items, key=lambda item: item['id'])
+        return keys, items, dict(index), by_id
+
+    def _get_snapshot(self):
+        version = get_version('ingredients')
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    # Снимок живет до новой версии: строится по основной БД
+                    with primary():
+                        self._snapshot = self._build()
+                    self._version = version
+        return self._snapshot
+
+    def all(self):
+        """Все ингредиенты в порядке id."""
+        return self._get_snapshot()[3]
+
+    def search(self, query, limit=None):
+        """
+        Поиск по началу названия, затем по вхождению подстроки.
+        Внутри каждой группы результаты отсортированы по названию.
+        """
+        keys, items, index, _ = self._get_snapshot()
+        query = normalize(query.strip())
+        if not query:
+            return items[:limit]
+        found = []
+        position = bisect_left(keys, query)
+        while position < len(keys) and keys[position].startswith(query):
+            found.append(position)
+            position += 1
+        if (limit is not None and len(found) >= limit
+                or len(query) < MIN_SUBSTRING_LENGTH):
+            return [items[position] for position in found[:limit]]
+        if len(query) < TRIGRAM_LENGTH:
+            candidates = range(len(keys))
+        else:
+            postings = sorted(
+                (index.get(gram, ()) for gram in trigrams(query)), key=len
+            )
+            candidates = set(postings[0]).intersection(*postings[1:])
+        prefixed = set(found)
+        found.extend(sorted(
+            (position for position in candidates
+             if position not in prefixed and query in keys[position]),
+            key=lambda position: (keys[position].find(query), position)
+        ))
+        return [items[position] for position in found[:limit]]
+
+
+ingredient_index = IngredientIndex()
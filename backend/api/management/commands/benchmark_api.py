@@ -0,0 +1,256 @@
+import json
+import math
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+# Прозрачный GIF 1x1 в base64 для создания рецептов
+IMAGE = (
+    'data:image/gif;base64,R0lGODlhAQABAIAAAP///wAAACH5BAEAAAAALAAAAAABAAEA'
+    'AAICRAEAOw=='
+)
+
+
+def percentile(values, share):
+    """Перцентиль методом ближайшего ранга."""
+    values = sorted(values)
+    return values[max(math.ceil(share * len(values)) - 1, 0)]
+
+
+def parse_limits(values, cast):
+    """Пороги вида имя=значение из повторяемых аргументов."""
+    limits = {}
+    for value in values:
+        name, separator, limit = value.partition('=')
+        if not separator:
+            raise CommandError(f'Ожидается имя=значение: {value}')
+        limits[name] = cast(limit)
+    return limits
+
+
+class QueryCounter:
+    """Счетчик SQL-запросов через connection.execute_wrapper."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер p50/p95 времени ответа и числа SQL-запросов основных '
+        'эндпоинтов API на текущей БД (SQLite или PostgreSQL). '
+        'Данные - generate_fake_data. При превышении порогов '
+        'команда завершается с ошибкой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--scenario', action='append', default=[],
+            help='Запустить только эти сценарии (можно несколько раз).'
+        )
+        parser.add_argument(
+            '--max-p95', action='append', default=[], metavar='NAME=MS',
+            help='Порог p95 в мс для сценария.'
+        )
+        parser.add_argument(
+            '--max-queries', action='append', default=[], metavar='NAME=N',
+            help='Порог числа SQL-запросов для сценария.'
+        )
+        parser.add_argument(
+            '--thresholds', metavar='FILE',
+            help='JSON {"сценарий": {"p95_ms": 50, "queries": 8}}.'
+        )
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Результаты в JSON вместо таблицы.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.setup()
+        scenarios = self.scenarios()
+        unknown = set(options['scenario']) - set(scenarios)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные сценарии: {", ".join(sorted(unknown))}. '
+                f'Доступны: {", ".join(scenarios)}.'
+            )
+        names = options['scenario'] or list(scenarios)
+        results = {
+            name: self.run(scenarios[name], options['iterations'],
+                           options['warmup'])
+            for name in names
+        }
+        self.report(results, options['json'])
+        failures = self.check_thresholds(results, options)
+        if failures:
+            raise CommandError('Пороги превышены:\n' + '\n'.join(failures))
+
+    def setup(self):
+        self.user = User.objects.filter(
+            shopping_cart__isnull=False, following__isnull=False
+        ).order_by('id').first()
+        if self.user is None or not Recipe.objects.exists():
+            raise CommandError(
+                'Нет данных: сначала выполните generate_fake_data.'
+            )
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.anonymous = Client()
+        self.recipe_ids = list(
+            Recipe.objects.order_by('-id').values_list('id', flat=True)[:500]
+        )
+        self.tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+        self.ingredient_ids = list(
+            Ingredient.objects.values_list('id', flat=True)[:2000]
+        )
+        self.ingredient_prefixes = [
+            name[:3] for name in
+            Ingredient.objects.values_list('name', flat=True)[:200]
+        ]
+
+    def scenarios(self):
+        """Сценарий: функция, выполняющая один запрос и возвращающая его."""
+        rng = self.rng
+        return {
+            'recipe_list': lambda: self.anonymous.get(
+                '/api/recipes/', {'page': rng.randint(1, 20)}
+            ),
+            'recipe_list_filtered': lambda: self.client.get(
+                '/api/recipes/', {
+                    'tags': rng.sample(self.tag_slugs, 2)
+                    if len(self.tag_slugs) > 1 else self.tag_slugs,
+                    'is_favorited': rng.choice((0, 1)),
+                    'ordering': rng.choice(('popular', 'trending')),
+                }
+            ),
+            'recipe_search': lambda: self.client.get(
+                '/api/recipes/', {'search': rng.choice(
+                    self.ingredient_prefixes
+                )}
+            ),
+            'recipe_detail': lambda: self.client.get(
+                f'/api/recipes/{rng.choice(self.recipe_ids)}/'
+            ),
+            'subscriptions': lambda: self.client.get(
+                '/api/users/subscriptions/', {'recipes_limit': 3}
+            ),
+            'ingredient_search': lambda: self.anonymous.get(
+                '/api/ingredients/', {'name': rng.choice(
+                    self.ingredient_prefixes
+                )}
+            ),
+            'pantry': lambda: self.client.get(
+                '/api/recipes/pantry/', {'ingredients': ','.join(
+                    map(str, rng.sample(self.ingredient_ids, 10))
+                )}
+            ),
+            'shopping_cart_download': lambda: self.client.get(
+                '/api/recipes/download_shopping_cart/', {'format': 'txt'}
+            ),
+            'recipe_create': self.create_recipe,
+        }
+
+    def create_recipe(self):
+        """Создание рецепта с откатом: данные БД и MEDIA_ROOT не меняются.
+
+        Картинка сохраняется во временный каталог, который удаляется
+        после запроса; копии не кодируются, так как транзакция
+        откатывается.
+        """
+        body = {
+            'name': 'Замер',
+            'text': 'Рецепт для замера скорости создания',
+            'cooking_time': 10,
+            'image': IMAGE,
+            'tags': self.rng.sample(
+                list(Tag.objects.values_list('id', flat=True)), 1
+            ),
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 10}
+                for ingredient_id in self.rng.sample(self.ingredient_ids, 8)
+            ],
+        }
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root), \
+                transaction.atomic():
+            response = self.client.post(
+                '/api/recipes/', json.dumps(body),
+                content_type='application/json'
+            )
+            transaction.set_rollback(True)
+        return response
+
+    def run(self, scenario, iterations, warmup):
+        for _ in range(warmup):
+            scenario()
+        timings, queries = [], []
+        for _ in range(iterations):
+            counter = QueryCounter()
+            with connections['default'].execute_wrapper(counter):
+                started = time.perf_counter()
+                response = scenario()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'Ответ {response.status_code}: {response.content[:500]}'
+                )
+            queries.append(counter.count)
+        return {
+            'p50_ms': round(percentile(timings, 0.5), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': max(queries),
+        }
+
+    def report(self, results, as_json):
+        if as_json:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f'{"сценарий":<24}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"max, мс":>10}{"запросов":>10}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<24}{result["p50_ms"]:>10}{result["p95_ms"]:>10}'
+                f'{result["max_ms"]:>10}{result["queries"]:>10}'
+            )
+
+    def check_thresholds(self, results, options):
+        thresholds = {}
+        if options['thresholds']:
+            with open(options['thresholds'], encoding='utf-8') as file:
+                thresholds = json.load(file)
+        for name, limit in parse_limits(options['max_p95'], float).items():
+            thresholds.setdefault(name, {})['p95_ms'] = limit
+        for name, limit in parse_limits(options['max_queries'], int).items():
+            thresholds.setdefault(name, {})['queries'] = limit
+        failures = []
+        for name, limits in thresholds.items():
+            if name not in results:
+                continue
+            for metric, limit in limits.items():
+                if results[name][metric] > limit:
+                    failures.append(
+                        f'{name}: {metric} = {results[name][metric]} '
+                        f'> {limit}'
+                    )
+        return failures
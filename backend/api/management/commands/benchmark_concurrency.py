@@ -0,0 +1,137 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.benchmark_api import percentile
+
+
+async def fetch(host, port, path):
+    """GET по HTTP/1.0: ответ читается до закрытия соединения."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f'GET {path} HTTP/1.0\r\nHost: {host}\r\n\r\n'.encode()
+        )
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def slow_client(host, port, path, stop):
+    """
+    Медленный клиент: заголовки запроса по байту в секунду.
+    Синхронный воркер ждет его целиком, цикл событий - нет.
+    """
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n'.encode())
+        while not stop.is_set():
+            writer.write(b'X')
+            await writer.drain()
+            try:
+                await asyncio.wait_for(stop.wait(), 1)
+            except asyncio.TimeoutError:
+                pass
+    except OSError:
+        pass
+    finally:
+        writer.close()
+
+
+async def run(url, concurrency, duration, slow_clients):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    stop = asyncio.Event()
+    slow = [
+        asyncio.create_task(slow_client(host, port, path, stop))
+        for _ in range(slow_clients)
+    ]
+    await asyncio.sleep(0.5 if slow_clients else 0)
+    timings, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(
+                    fetch(host, port, path), duration
+                )
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                errors += 1
+                continue
+            if status >= 400:
+                errors += 1
+                continue
+            timings.append(time.perf_counter() - started)
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+    stop.set()
+    await asyncio.gather(*slow)
+    return {
+        'url': url,
+        'requests': len(timings),
+        'errors': errors,
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(percentile(timings, 0.5) * 1000, 2)
+        if timings else None,
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 2)
+        if timings else None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Пропускная способность при множестве одновременных соединений: '
+        'сравнение запущенных серверов, например gunicorn с sync-воркерами '
+        '(foodgram.wsgi) и с uvicorn-воркерами (foodgram.asgi). '
+        '--slow-clients держит соединения медленных клиентов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'urls', nargs='+',
+            help='Полные URL, например http://127.0.0.1:8001/api/tags/.'
+        )
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Длительность замера для каждого URL (сек.).'
+        )
+        parser.add_argument('--slow-clients', type=int, default=0)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        results = []
+        for url in options['urls']:
+            if not url.startswith('http://'):
+                raise CommandError(f'Ожидается http:// URL: {url}')
+            results.append(asyncio.run(run(
+                url, options['concurrency'], options['duration'],
+                options['slow_clients']
+            )))
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f'{"url":<45}{"запросов":>10}{"ошибок":>8}{"RPS":>9}'
+            f'{"p50, мс":>10}{"p95, мс":>10}'
+        )
+        for result in results:
+            self.stdout.write(
+                f'{result["url"]:<45}{result["requests"]:>10}'
+                f'{result["errors"]:>8}{result["rps"]:>9}'
+                f'{result["p50_ms"] or "-":>10}{result["p95_ms"] or "-":>10}'
+            )
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.test import Client
+
+from api.management.commands.benchmark_api import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Цена соединения с БД на запрос: одни и те же запросы к API '
+        'с CONN_MAX_AGE=0 (соединение на каждый запрос) и с постоянным '
+        'соединением. Соединения закрываются так же, как по сигналам '
+        'начала и конца запроса в gunicorn.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--url', default='/api/tags/')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--max-age', type=int, default=60,
+            help='CONN_MAX_AGE постоянного режима (сек.).'
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        original = connection.settings_dict['CONN_MAX_AGE']
+        client = Client()
+        results = {}
+        try:
+            for max_age in (0, options['max_age']):
+                connection.close()
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                timings, connects = [], 0
+                for _ in range(options['iterations']):
+                    started = time.perf_counter()
+                    # Тестовый клиент отключает close_old_connections,
+                    # здесь он вызывается как в обработчике WSGI.
+                    close_old_connections()
+                    if connection.connection is None:
+                        connects += 1
+                    client.get(options['url'])
+                    close_old_connections()
+                    timings.append(time.perf_counter() - started)
+                results[max_age] = (timings, connects)
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = original
+
+        self.stdout.write(
+            f'{connection.vendor} {options["url"]}, '
+            f'{options["iterations"]} запросов'
+        )
+        self.stdout.write(
+            f'{"CONN_MAX_AGE":<14}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"соединений":>12}'
+        )
+        for max_age, (timings, connects) in results.items():
+            self.stdout.write(
+                f'{max_age:<14}{percentile(timings, 0.5) * 1000:>10.2f}'
+                f'{percentile(timings, 0.95) * 1000:>10.2f}{connects:>12}'
+            )
+        fresh, persistent = (
+            percentile(timings, 0.5) for timings, _ in results.values()
+        )
+        self.stdout.write(
+            f'Накладные расходы соединения: {(fresh - persistent) * 1000:.2f} '
+            'мс на запрос (p50).'
+        )
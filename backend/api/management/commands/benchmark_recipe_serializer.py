@@ -0,0 +1,85 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from api.fast_serializers import RecipeReadSerializer, recipe_rows
+from api.serializers import RecipeSerializer
+from api.views import RecipeViewSet
+from users.models import Subscription, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Время RecipeReadSerializer и RecipeSerializer на рецепт для '
+        'анонима и пользователя, для списка и карточки. Совпадение JSON '
+        'проверяет api/tests/test_recipe_serializer.py.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Сколько последних рецептов сверять.'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        users = [None]
+        follower = Subscription.objects.values_list(
+            'user_id', flat=True
+        ).first()
+        if follower is not None:
+            users.append(User.objects.get(pk=follower))
+        for user in users:
+            for action in ('list', 'retrieve'):
+                self.measure(user, action, options)
+
+    def get_view(self, user, action):
+        request = Request(RequestFactory().get('/api/recipes/'))
+        if user is not None:
+            request.user = user
+        view = RecipeViewSet(action=action, request=request, format_kwarg=None)
+        return view
+
+    def measure(self, user, action, options):
+        view = self.get_view(user, action)
+        queryset = view.get_queryset()[:options['recipes']]
+        context = view.get_serializer_context()
+        recipes = list(queryset)
+        fast = view.read_serializer(recipe_rows(queryset))
+        # Связи загружаются при первом обращении к data, до замера
+        fast.data
+        label = f'{user or "anonymous"}/{action}'
+
+        count = len(recipes) * options['repeat']
+        started = time.perf_counter()
+        for _ in range(options['repeat']):
+            RecipeSerializer(recipes, many=True, context=context).data
+        drf = (time.perf_counter() - started) / count
+        started = time.perf_counter()
+        for _ in range(options['repeat']):
+            [fast.to_representation(row) for row in fast.rows]
+        rows = (time.perf_counter() - started) / count
+
+        started = time.perf_counter()
+        for _ in range(options['repeat']):
+            RecipeSerializer(
+                list(view.get_queryset()[:options['recipes']]),
+                many=True, context=context
+            ).data
+        drf_total = (time.perf_counter() - started) / count
+        started = time.perf_counter()
+        for _ in range(options['repeat']):
+            RecipeReadSerializer(
+                recipe_rows(view.get_queryset()[:options['recipes']]),
+                request=view.request, rendition=fast.rendition
+            ).data
+        rows_total = (time.perf_counter() - started) / count
+
+        self.stdout.write(
+            f'{label} ({len(recipes)} рецептов): '
+            f'сериализация {drf * 1e6:.0f} -> {rows * 1e6:.0f} мкс '
+            f'(x{drf / rows:.1f}), с запросами {drf_total * 1e6:.0f} -> '
+            f'{rows_total * 1e6:.0f} мкс (x{drf_total / rows_total:.1f})'
+        )
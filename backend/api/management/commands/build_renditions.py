@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from api.images import (AVATAR_RENDITIONS, RECIPE_RENDITIONS, build_renditions,
+                        rendered_field)
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Подготовка недостающих уменьшенных копий фото рецептов и аватаров '
+        'и отметка о готовых копиях в моделях'
+    )
+
+    def handle(self, *args, **options):
+        sources = (
+            (Recipe, 'image', RECIPE_RENDITIONS),
+            (User, 'avatar', AVATAR_RENDITIONS),
+        )
+        count = marked = failed = 0
+        for model, field, renditions in sources:
+            queryset = model.objects.exclude(**{field: ''}).exclude(
+                **{field: None}
+            ).exclude(**{rendered_field(field): F(field)})
+            for obj in queryset.only('pk', field).iterator():
+                field_file = getattr(obj, field)
+                try:
+                    count += len(build_renditions(
+                        model, obj.pk, field, field_file.storage,
+                        field_file.name, renditions
+                    ))
+                except Exception as error:
+                    self.stderr.write(f'{field_file.name}: {error}')
+                    failed += 1
+                else:
+                    marked += 1
+        self.stdout.write(
+            f'Подготовлено копий: {count}, отмечено записей: {marked}, '
+            f'ошибок: {failed}'
+        )
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Exists, OuterRef, Sum
+from django.utils import timezone
+
+from recipes.models import (Favorite, Recipe, RecipeIngredient, ShoppingCart,
+                            Tag)
+from users.models import Subscription, User
+
+
+def hot_queries(user_id, author_id, recipe_id, tag_slug):
+    """Запросы в той форме, в какой их строят представления и фильтры."""
+    return {
+        'рецепты автора': Recipe.objects.filter(
+            author_id=author_id
+        ).order_by('-id')[:6],
+        'рецепты по тегу': Recipe.objects.filter(
+            tags__slug__in=[tag_slug]
+        ).distinct().order_by('-id')[:6],
+        'флаг is_favorited': Recipe.objects.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user_id=user_id, recipe=OuterRef('pk')
+            ))
+        ).filter(is_favorited=True).order_by('-id')[:6],
+        'число добавлений рецепта': Favorite.objects.filter(
+            recipe_id=recipe_id
+        ),
+        'лента подписок': User.objects.filter(
+            follower__user_id=user_id
+        ).order_by('username')[:6],
+        'подписчики автора': Subscription.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True),
+        'список покупок': RecipeIngredient.objects.filter(
+            recipe__shopping_cart__user_id=user_id
+        ).values('ingredient_id').annotate(total=Sum('amount')).order_by(),
+        'активность для трендов': ShoppingCart.objects.filter(
+            created__gte=timezone.now() - timedelta(days=16)
+        ).values_list('recipe_id', 'created'),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Планы выполнения (EXPLAIN) основных запросов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='EXPLAIN ANALYZE (только PostgreSQL): с реальным временем.'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(following__isnull=False).first()
+        author = User.objects.filter(recipes__isnull=False).first()
+        recipe = Recipe.objects.first()
+        tag = Tag.objects.first()
+        if None in (user, author, recipe, tag):
+            raise CommandError(
+                'Нужны пользователь с подписками, рецепт и тег.'
+            )
+        explain_options = {}
+        if connection.vendor == 'postgresql':
+            explain_options = {'analyze': options['analyze']}
+        for name, queryset in hot_queries(
+            user.id, author.id, recipe.id, tag.slug
+        ).items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(queryset.explain(**explain_options))
@@ -0,0 +1,195 @@
+import random
+import time
+from functools import partial
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Sum
+
+from api.cache import bump_version
+from api.counters import counter_sources, recount
+from api.pantry import PANTRY_VERSION
+from api.search import index_recipes
+from api.trending import refresh_trending
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingCartIngredient, Tag)
+from users.models import Subscription, User
+
+# Прозрачный GIF 1x1 - общая картинка всех сгенерированных рецептов
+PLACEHOLDER_IMAGE = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04'
+    b'\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D'
+    b'\x01\x00;'
+)
+PLACEHOLDER_NAME = 'rescipes/image/fake.gif'
+FAKE_PASSWORD = 'fake-password'
+
+
+def popular_choices(rng, population, count):
+    """
+    Выборка без повторов со смещением к началу списка:
+    популярные рецепты и авторы набирают больше связей.
+    """
+    if count * 2 >= len(population):
+        return rng.sample(population, min(count, len(population)))
+    chosen = set()
+    while len(chosen) < count:
+        index = int(len(population) * rng.random() ** 3)
+        chosen.add(population[index])
+    return list(chosen)
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерация синтетических данных для нагрузочных тестов: '
+        'пользователи, рецепты из ингредиентов справочника, избранное, '
+        'корзины и подписки. Пользователи - fake_<n>@example.com.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=8,
+            help='Среднее число ингредиентов в рецепте.'
+        )
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--carts-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора: одинаковые данные при повторе.'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        if not Ingredient.objects.exists() or not Tag.objects.exists():
+            call_command('import_csv', stdout=self.stdout)
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        if not ingredient_ids or not tag_ids:
+            raise CommandError('Справочники ингредиентов и тегов пусты.')
+        if not default_storage.exists(PLACEHOLDER_NAME):
+            default_storage.save(
+                PLACEHOLDER_NAME, ContentFile(PLACEHOLDER_IMAGE)
+            )
+        started = time.monotonic()
+        with transaction.atomic():
+            user_ids = self.create_users(options['users'])
+            recipe_ids = self.create_recipes(
+                rng, options['recipes'], user_ids, ingredient_ids, tag_ids,
+                options['ingredients_per_recipe']
+            )
+            for model, per_user in (
+                (Favorite, options['favorites_per_user']),
+                (ShoppingCart, options['carts_per_user']),
+            ):
+                self.bulk_create(model, (
+                    model(user_id=user_id, recipe_id=recipe_id)
+                    for user_id in user_ids
+                    for recipe_id in popular_choices(rng, recipe_ids, per_user)
+                ))
+            per_user = options['subscriptions_per_user']
+            self.bulk_create(Subscription, (
+                Subscription(user_id=user_id, author_id=author_id)
+                for user_id in user_ids
+                for author_id in [
+                    author_id for author_id in popular_choices(
+                        rng, user_ids, per_user + 1
+                    ) if author_id != user_id
+                ][:per_user]
+            ))
+            self.stdout.write('Пересчет производных данных...')
+            self.rebuild_derived(user_ids)
+            for name in ('recipes', 'users', PANTRY_VERSION):
+                transaction.on_commit(partial(bump_version, name))
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(user_ids)}, рецептов: '
+            f'{len(recipe_ids)} за {time.monotonic() - started:.1f} с'
+        ))
+
+    def bulk_create(self, model, objects):
+        model.objects.bulk_create(
+            objects, batch_size=self.batch_size, ignore_conflicts=True
+        )
+
+    def new_ids(self, model, previous_max):
+        """id записей после bulk_create: SQLite их не возвращает."""
+        return list(model.objects.filter(
+            id__gt=previous_max or 0
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_users(self, count):
+        previous_max = User.objects.aggregate(Max('id'))['id__max']
+        start = previous_max or 0
+        password = make_password(FAKE_PASSWORD)
+        self.bulk_create(User, (
+            User(
+                email=f'fake_{start + number}@example.com',
+                username=f'fake_{start + number}',
+                first_name='Тест',
+                last_name='Пользователь',
+                password=password,
+            )
+            for number in range(1, count + 1)
+        ))
+        return self.new_ids(User, previous_max)
+
+    def create_recipes(self, rng, count, user_ids, ingredient_ids, tag_ids,
+                       ingredients_per_recipe):
+        previous_max = Recipe.objects.aggregate(Max('id'))['id__max']
+        self.bulk_create(Recipe, (
+            Recipe(
+                author_id=popular_choices(rng, user_ids, 1)[0],
+                name=f'Рецепт {number}',
+                text=f'Описание рецепта {number}',
+                cooking_time=rng.randint(5, 180),
+                image=PLACEHOLDER_NAME,
+            )
+            for number in range(1, count + 1)
+        ))
+        recipe_ids = self.new_ids(Recipe, previous_max)
+        self.bulk_create(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id, ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500)
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(ingredient_ids, min(
+                len(ingredient_ids),
+                max(1, int(rng.gauss(ingredients_per_recipe, 2)))
+            ))
+        ))
+        tags = Recipe.tags.through
+        self.bulk_create(tags, (
+            tags(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(tag_ids, rng.randint(1, len(tag_ids)))
+        ))
+        return recipe_ids
+
+    def rebuild_derived(self, user_ids):
+        """Данные, которые обычно поддерживают сигналы save/delete."""
+        for (target, counter), sources in counter_sources().items():
+            recount(target, counter, sources)
+        totals = RecipeIngredient.objects.filter(
+            recipe__shopping_cart__user_id__in=user_ids
+        ).values(
+            'recipe__shopping_cart__user_id', 'ingredient_id'
+        ).annotate(total=Sum('amount')).order_by()
+        self.bulk_create(ShoppingCartIngredient, (
+            ShoppingCartIngredient(
+                user_id=row['recipe__shopping_cart__user_id'],
+                ingredient_id=row['ingredient_id'],
+                amount=row['total']
+            )
+            for row in totals.iterator()
+        ))
+        index_recipes()
+        refresh_trending()
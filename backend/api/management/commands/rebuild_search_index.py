@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.search import index_recipes
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Полная перестройка полнотекстового индекса рецептов'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            index_recipes()
+        self.stdout.write(
+            f'Проиндексировано рецептов: {Recipe.objects.count()}'
+        )
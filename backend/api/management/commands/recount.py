@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.counters import counter_sources, recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчет счетчиков избранного, корзин, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        for (target, counter), sources in counter_sources().items():
+            with transaction.atomic():
+                fixed = recount(target, counter, sources)
+            self.stdout.write(
+                f'{target.__name__}.{counter}: исправлено записей {fixed}'
+            )
@@ -0,0 +1,40 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет рейтинга трендов рецептов. С --loop работает '
+        'как фоновый процесс и пересчитывает рейтинг с заданным периодом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', type=int, default=0, metavar='SECONDS',
+            help='Период пересчета в секундах; 0 - пересчитать один раз.'
+        )
+        parser.add_argument(
+            '--half-life', type=float, metavar='HOURS',
+            help='Период полураспада активности в часах.'
+        )
+
+    def handle(self, *args, **options):
+        half_life = options['half_life'] and timedelta(
+            hours=options['half_life']
+        )
+        while True:
+            started = time.monotonic()
+            updated = refresh_trending(half_life=half_life)
+            self.stdout.write(
+                f'Обновлено рейтингов: {updated} '
+                f'({time.monotonic() - started:.2f} с)'
+            )
+            if not options['loop']:
+                return
+            close_old_connections()
+            time.sleep(options['loop'])
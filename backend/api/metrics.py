@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм: время в секундах и число SQL-запросов
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+METRICS = {
+    'foodgram_request_duration_seconds': (
+        'histogram', 'Полное время обработки запроса', DURATION_BUCKETS
+    ),
+    'foodgram_sql_duration_seconds': (
+        'histogram', 'Время SQL-запросов за запрос', DURATION_BUCKETS
+    ),
+    'foodgram_serializer_duration_seconds': (
+        'histogram', 'Время сериализации ответа', DURATION_BUCKETS
+    ),
+    'foodgram_sql_queries': (
+        'histogram', 'Число SQL-запросов за запрос', QUERY_BUCKETS
+    ),
+    'foodgram_slow_requests_total': (
+        'counter', 'Запросы медленнее SLOW_REQUEST_MS', None
+    ),
+}
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield '_bucket', (('le', format_value(bound)),), cumulative
+        yield '_bucket', (('le', '+Inf'),), self.count
+        yield '_sum', (), self.sum
+        yield '_count', (), self.count
+
+
+class Counter:
+    """Монотонно растущий счетчик."""
+
+    def __init__(self):
+        self.value = 0
+
+    def observe(self, value):
+        self.value += value
+
+    def samples(self):
+        yield '', (), self.value
+
+
+def format_value(value):
+    """Число в формате Prometheus: целые без точки."""
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def escape_label(value):
+    """Экранирование значения метки."""
+    return (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+class Registry:
+    """
+    Метрики процесса в памяти: (имя, метки) -> гистограмма или счетчик.
+    У каждого рабочего процесса свой реестр.
+    """
+
+    def __init__(self, metrics):
+        self.metrics = dict(metrics)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, kind, description, buckets=None):
+        """Описание метрики, добавляемой другим модулем."""
+        self.metrics.setdefault(name, (kind, description, buckets))
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                kind, _, buckets = self.metrics[name]
+                series = self._series[key] = (
+                    Histogram(buckets) if kind == 'histogram' else Counter()
+                )
+            series.observe(value)
+
+    def inc(self, name, labels, amount=1):
+        self.observe(name, labels, amount)
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        with self._lock:
+            series = sorted(self._series.items())
+        for name, (kind, description, _) in self.metrics.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for (series_name, labels), metric in series:
+                if series_name != name:
+                    continue
+                for suffix, extra, value in metric.samples():
+                    pairs = ','.join(
+                        f'{key}="{escape_label(label)}"'
+                        for key, label in labels + extra
+                    )
+                    lines.append(
+                        f'{name}{suffix}{{{pairs}}} {format_value(value)}'
+                    )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(METRICS)
+
+
+class RequestMetrics:
+    """Замеры одного запроса: SQL-запросы, их время и сериализация."""
+
+    def __init__(self, capture_limit):
+        self.view = None
+        self.action = None
+        self.queries = 0
+        self.sql_time = 0
+        self.serializer_time = 0
+        self.capture_limit = capture_limit
+        self.captured = []
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обертка connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.sql_time += elapsed
+            if len(self.captured) < self.capture_limit:
+                self.captured.append((elapsed, sql))
+
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Обертка execute_wrapper каждого соединения: запрос учитывается в
+    замерах текущего HTTP-запроса. Замеры передаются через ContextVar,
+    который sync_to_async копирует в поток представления, поэтому под
+    ASGI учитываются и синхронные представления Django.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    """Установка record_query на соединение один раз."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+from api.db_routers import (is_pinned, pin_to_primary, read_from_replica,
+                            replica_configured)
+from api.metrics import RequestMetrics, current_metrics, logger, registry
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """
+    Число и время SQL-запросов, время сериализации и полное время
+    запроса по представлению и действию. Медленные запросы
+    пишутся в лог вместе с их SQL.
+    SQL замеряет record_query на соединениях в любом потоке.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        metrics = RequestMetrics(settings.SLOW_REQUEST_MAX_QUERIES)
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.record(request, response, metrics,
+                    time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        metrics = RequestMetrics(settings.SLOW_REQUEST_MAX_QUERIES)
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.record(request, response, metrics,
+                    time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, metrics, elapsed):
+        match = request.resolver_match
+        labels = {
+            'view': metrics.view or (
+                match.view_name if match else 'unresolved'
+            ),
+            'action': metrics.action or request.method.lower(),
+        }
+        registry.observe('foodgram_request_duration_seconds', labels, elapsed)
+        registry.observe(
+            'foodgram_sql_duration_seconds', labels, metrics.sql_time
+        )
+        registry.observe('foodgram_sql_queries', labels, metrics.queries)
+        if metrics.serializer_time:
+            registry.observe(
+                'foodgram_serializer_duration_seconds', labels,
+                metrics.serializer_time
+            )
+        if elapsed * 1000 < settings.SLOW_REQUEST_MS:
+            return
+        registry.inc('foodgram_slow_requests_total', labels)
+        logger.warning(
+            'Медленный запрос %s %s (%s): %.0f мс, SQL: %d запросов '
+            'за %.0f мс, сериализация %.0f мс\n%s',
+            request.method, request.get_full_path(), response.status_code,
+            elapsed * 1000, metrics.queries, metrics.sql_time * 1000,
+            metrics.serializer_time * 1000,
+            '\n'.join(
+                f'{duration * 1000:8.1f} мс  {sql}'
+                for duration, sql in metrics.captured
+            )
+        )
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Чтение с реплики только в безопасных запросах (GET, HEAD, OPTIONS)
+    и только для клиентов, не писавших в последние REPLICA_PIN_SECONDS.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_configured():
+            return self.get_response(request)
+        safe = request.method in SAFE_METHODS
+        token = read_from_replica.set(safe and not is_pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        if not safe:
+            pin_to_primary(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not replica_configured():
+            return await self.get_response(request)
+        safe = request.method in SAFE_METHODS
+        token = read_from_replica.set(safe and not is_pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        if not safe:
+            pin_to_primary(request, response)
+        return response
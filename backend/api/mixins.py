@@ -0,0 +1,187 @@
+import hashlib
+import time
+from functools import lru_cache
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.cache import get_version, get_versions, relation_version
+from api.db_routers import primary
+from api.metrics import current_metrics, registry
+
+registry.register(
+    'foodgram_response_cache_requests_total', 'counter',
+    'Обращения к кэшу ответов анонимам по result: hit или miss'
+)
+
+
+@lru_cache(maxsize=None)
+def timed_serializer(serializer_class):
+    """Подкласс сериализатора, суммирующий время to_representation."""
+
+    def to_representation(self, instance):
+        started = time.perf_counter()
+        try:
+            return super(timed, self).to_representation(instance)
+        finally:
+            metrics = current_metrics.get()
+            if metrics is not None:
+                metrics.serializer_time += time.perf_counter() - started
+
+    timed = type(
+        serializer_class.__name__, (serializer_class,),
+        {'to_representation': to_representation,
+         '__module__': serializer_class.__module__}
+    )
+    return timed
+
+
+class MetricsMixin:
+    """
+    Метки представления и действия для MetricsMiddleware
+    и замер времени сериализации ответа.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.view = getattr(self, 'basename', None) or (
+                type(self).__name__
+            )
+            metrics.action = getattr(self, 'action', None) or (
+                request.method.lower()
+            )
+        super().initial(request, *args, **kwargs)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = timed_serializer(self.get_serializer_class())
+        kwargs.setdefault('context', self.get_serializer_context())
+        return serializer_class(*args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы для справочников и рецептов.
+    ETag строится из версий таблиц, при совпадении If-None-Match
+    возвращается 304 без обращения к БД и сериализации. Тело под
+    ETag читается с основной БД.
+    """
+    etag_resources = ()
+    etag_actions = ('list', 'retrieve')
+    etag_per_user = False
+
+    def get_etag(self, request):
+        parts = [self.basename, self.action, request.get_full_path()]
+        parts += [str(get_version(name)) for name in self.etag_resources]
+        if self.etag_per_user and request.user.is_authenticated:
+            parts += [
+                str(request.user.id),
+                str(relation_version(request.user.id)),
+            ]
+        digest = hashlib.md5(':'.join(parts).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in etags or '*' in etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            # ETag из текущих версий: тело с отставшей реплики клиенты
+            # и прокси хранили бы под ним до следующей записи
+            with primary():
+                response = handler(request, *args, **kwargs)
+        if response.status_code in (
+            status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+        ):
+            response['ETag'] = etag
+        if self.etag_per_user:
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if 'list' not in self.etag_actions:
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if 'retrieve' not in self.etag_actions:
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class AnonymousCacheMixin:
+    """
+    Кэш ответов анонимам для list и retrieve.
+    Ключ - нормализованная строка запроса и версии данных из
+    get_cache_versions. Версии читаются до обращения к БД: ответ,
+    собранный параллельно с записью, сохраняется под старой версией
+    и после ее смены больше не читается.
+    """
+    cache_actions = ('list', 'retrieve')
+    # Параметры, с которыми ответ не кэшируется
+    cache_bypass_params = ()
+
+    def get_cache_versions(self, request, **kwargs):
+        """Имена версий, от которых зависит ответ; None - не кэшировать."""
+        return None
+
+    def get_cache_key(self, request, versions, **kwargs):
+        query = urlencode(sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+        ))
+        parts = [query, *map(str, versions)]
+        parts += [f'{key}={value}' for key, value in sorted(kwargs.items())]
+        digest = hashlib.md5(':'.join(parts).encode()).hexdigest()
+        return f'response:{self.basename}:{self.action}:{digest}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        names = None
+        if (settings.RESPONSE_CACHE_TIMEOUT
+                and self.action in self.cache_actions
+                and not request.user.is_authenticated
+                and not any(
+                    param in request.query_params
+                    for param in self.cache_bypass_params
+                )):
+            names = self.get_cache_versions(request, **kwargs)
+        if names is None:
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request, get_versions(names), **kwargs)
+        labels = {'view': self.basename, 'action': self.action}
+        data = cache.get(key)
+        if data is not None:
+            registry.inc(
+                'foodgram_response_cache_requests_total',
+                {**labels, 'result': 'hit'}
+            )
+            return Response(data)
+        registry.inc(
+            'foodgram_response_cache_requests_total',
+            {**labels, 'result': 'miss'}
+        )
+        # Отставшая реплика вернула бы в кэш данные до новой версии
+        with primary():
+            response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -1,7 +1,81 @@
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       PageNumberPagination)
 
 
 class PageLimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
-    max_page_size = 6
+    max_page_size = settings.MAX_PAGE_SIZE
     page_size = 6
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация без COUNT(*) и OFFSET по одному уникальному
+    полю: -id у рецептов, username у подписок. При другом порядке
+    (популярность, релевантность) DRF доходил бы до нужной строки
+    через OFFSET среди равных значений, поэтому такие выборки
+    листаются постранично.
+    """
+    ordering = '-id'
+    page_size_query_param = 'limit'
+    max_page_size = settings.CURSOR_MAX_PAGE_SIZE
+    page_size = 6
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = ordering
+
+    @staticmethod
+    def unique_ordering(queryset):
+        """
+        Порядок выборки (явный или модели), если он по одному
+        уникальному полю, иначе None.
+        """
+        ordering = tuple(
+            queryset.query.order_by or queryset.model._meta.ordering
+        )
+        if len(ordering) != 1 or not isinstance(ordering[0], str):
+            return None
+        name = ordering[0].lstrip('-')
+        if name == 'pk':
+            return ordering[0]
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        return ordering[0] if field.unique else None
+
+
+class FeedPagination(BasePagination):
+    """
+    Постраничная пагинация по умолчанию, курсорная - по
+    ?pagination=cursor или при переданном курсоре, если выборка
+    упорядочена по одному уникальному полю. Иначе параметр
+    игнорируется.
+    """
+    mode_query_param = 'pagination'
+
+    def get_paginator(self, request, queryset):
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                or KeysetCursorPagination.cursor_query_param
+                in request.query_params):
+            ordering = KeysetCursorPagination.unique_ordering(queryset)
+            if ordering:
+                return KeysetCursorPagination(ordering)
+        return PageLimitPagination()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request, queryset)
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    @property
+    def display_page_controls(self):
+        return self.paginator.display_page_controls
+
+    def to_html(self):
+        return self.paginator.to_html()
@@ -0,0 +1,288 @@
+import threading
+import time
+from array import array
+
+from django.core.cache import cache
+
+from api.cache import bump_version, get_version
+from api.db_routers import primary
+from recipes.models import RecipeIngredient
+
+# Полная перестройка индекса: массовая загрузка, удаление ингредиентов
+PANTRY_VERSION = 'pantry'
+# Общий для процессов журнал измененных рецептов: номер -> id рецепта
+CHANGES_KEY = 'pantry:changes'
+CHANGES_TIMEOUT = 60 * 60 * 24
+# При большем отставании процессу дешевле перестроить индекс целиком
+MAX_CHANGES = 1000
+
+try:
+    popcount = int.bit_count
+except AttributeError:
+    def popcount(value):
+        return bin(value).count('1')
+
+
+def change_key(number):
+    return f'pantry:change:{number}'
+
+
+def last_change():
+    """
+    Номер последней записи журнала. Начальный номер - время в
+    наносекундах, как у версий: после потери кэша номера не
+    повторяются, а разрыв ведет к перестройке индекса.
+    """
+    number = cache.get(CHANGES_KEY)
+    if number is None:
+        cache.add(CHANGES_KEY, time.time_ns(), None)
+        number = cache.get(CHANGES_KEY)
+    return number
+
+
+def record_recipe_change(recipe_id):
+    """Запись рецепта в журнал: процессы обновят в индексе только его."""
+    cache.add(CHANGES_KEY, time.time_ns(), None)
+    try:
+        number = cache.incr(CHANGES_KEY)
+    except ValueError:
+        # Счетчик вытеснен между add и incr
+        bump_version(PANTRY_VERSION)
+        return
+    cache.set(change_key(number), recipe_id, CHANGES_TIMEOUT)
+
+
+def to_bitset(positions, size):
+    """Битовое множество (int) из массива позиций."""
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class PantryRanking:
+    """
+    Результат подбора: группы рецептов с одинаковым покрытием в виде
+    битовых множеств. Поддерживает len() и срезы, id извлекаются
+    только для запрошенной страницы.
+    """
+
+    def __init__(self, groups, recipe_ids):
+        self.groups = groups
+        self.recipe_ids = recipe_ids
+        self.count = sum(popcount(bits) for _, bits in groups)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, item):
+        start, stop, _ = item.indices(self.count)
+        limit = max(stop - start, 0)
+        result = []
+        for coverage, bits in self.groups:
+            if len(result) >= limit:
+                break
+            size = popcount(bits)
+            if start >= size:
+                start -= size
+                continue
+            # Внутри группы - по убыванию id, то есть со старших битов
+            while bits and len(result) < limit:
+                position = bits.bit_length() - 1
+                bits ^= 1 << position
+                if start:
+                    start -= 1
+                    continue
+                result.append((self.recipe_ids[position], coverage))
+        return result
+
+
+def without_position(posting, position):
+    """Копия списка рецептов ингредиента без позиции, None - если пуст."""
+    if isinstance(posting, array):
+        posting = array('l', (item for item in posting if item != position))
+    else:
+        posting &= ~(1 << position)
+    return posting or None
+
+
+def with_position(posting, position):
+    """Копия списка рецептов ингредиента с позицией."""
+    if posting is None:
+        return array('l', (position,))
+    if isinstance(posting, array):
+        return posting + array('l', (position,))
+    return posting | 1 << position
+
+
+class PantryIndex:
+    """
+    Обратный индекс ингредиент -> рецепты в памяти процесса.
+    Рецепт задан позицией в массиве id; для каждого ингредиента
+    хранится более компактное из двух: битовое множество позиций
+    или массив позиций. Измененные рецепты берутся из общего
+    журнала, и обновляются только их позиции. Целиком индекс
+    строится при старте, при новой версии 'pantry' и при разрыве
+    в журнале.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+        self._snapshot = None
+        # id рецепта -> (позиция, id его ингредиентов)
+        self._recipes = {}
+
+    def _build(self):
+        recipe_ids = array('q')
+        postings = {}
+        recipes = {}
+        for ingredient_id, recipe_id in RecipeIngredient.objects.order_by(
+            'recipe_id'
+        ).values_list('ingredient_id', 'recipe_id').iterator():
+            if not recipe_ids or recipe_ids[-1] != recipe_id:
+                recipe_ids.append(recipe_id)
+                recipes[recipe_id] = (len(recipe_ids) - 1, [])
+            position, ingredients = recipes[recipe_id]
+            ingredients.append(ingredient_id)
+            postings.setdefault(ingredient_id, array('l')).append(position)
+        total = len(recipe_ids)
+        for ingredient_id, positions in postings.items():
+            # Битовое множество меньше массива, если рецептов больше 1/64
+            if len(positions) * 64 > total:
+                postings[ingredient_id] = to_bitset(positions, total)
+        by_size = {}
+        for position, ingredients in recipes.values():
+            by_size.setdefault(len(ingredients), array('l')).append(position)
+        by_size = {
+            size: to_bitset(positions, total)
+            for size, positions in by_size.items()
+        }
+        self._recipes = {
+            recipe_id: (position, tuple(ingredients))
+            for recipe_id, (position, ingredients) in recipes.items()
+        }
+        return recipe_ids, postings, by_size
+
+    def _update(self, changed):
+        """
+        Обновление позиций измененных рецептов. Словари снимка
+        копируются: ранжирование в других потоках идет без блокировки.
+        Массив id только дополняется. False - если новый рецепт
+        нарушил бы порядок позиций по id.
+        """
+        current = {}
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=changed
+        ).values_list('recipe_id', 'ingredient_id'):
+            current.setdefault(recipe_id, []).append(ingredient_id)
+        recipe_ids, postings, by_size = self._snapshot
+        postings, by_size = dict(postings), dict(by_size)
+        for recipe_id in sorted(changed):
+            ingredients = tuple(current.get(recipe_id, ()))
+            position, previous = self._recipes.get(recipe_id, (None, ()))
+            if position is None:
+                if not ingredients:
+                    continue
+                if recipe_ids and recipe_id < recipe_ids[-1]:
+                    return False
+                recipe_ids.append(recipe_id)
+                position = len(recipe_ids) - 1
+            for ingredient_id in previous:
+                posting = without_position(postings[ingredient_id], position)
+                if posting is None:
+                    del postings[ingredient_id]
+                else:
+                    postings[ingredient_id] = posting
+            if previous:
+                bits = by_size[len(previous)] & ~(1 << position)
+                if bits:
+                    by_size[len(previous)] = bits
+                else:
+                    del by_size[len(previous)]
+            for ingredient_id in ingredients:
+                postings[ingredient_id] = with_position(
+                    postings.get(ingredient_id), position
+                )
+            if ingredients:
+                by_size[len(ingredients)] = (
+                    by_size.get(len(ingredients), 0) | 1 << position
+                )
+                self._recipes[recipe_id] = (position, ingredients)
+            else:
+                self._recipes.pop(recipe_id)
+        self._snapshot = recipe_ids, postings, by_size
+        return True
+
+    def _apply_changes(self, number):
+        """Изменения из журнала после последнего обновления процесса."""
+        applied = self._state and self._state[1]
+        if applied is None or number is None or not (
+            0 <= number - applied <= MAX_CHANGES
+        ):
+            return False
+        keys = [change_key(item) for item in range(applied + 1, number + 1)]
+        changed = cache.get_many(keys)
+        if len(changed) != len(keys):
+            return False
+        return self._update(set(changed.values()))
+
+    def _get_snapshot(self):
+        state = (get_version(PANTRY_VERSION), last_change())
+        if state != self._state:
+            with self._lock:
+                if state != self._state:
+                    # Индекс читает основную БД: реплика может отставать
+                    with primary():
+                        if (self._state is None
+                                or state[0] != self._state[0]
+                                or not self._apply_changes(state[1])):
+                            self._snapshot = self._build()
+                    self._state = state
+        return self._snapshot
+
+    def rank(self, ingredient_ids, min_coverage=0):
+        """
+        Рецепты хотя бы с одним ингредиентом из списка по убыванию
+        доли покрытых ингредиентов, затем числа совпадений и id.
+        Совпадения считаются побитовым сумматором над битовыми
+        множествами ингредиентов: O(ингредиентов запроса) операций
+        над целыми числами вместо цикла по рецептам.
+        """
+        recipe_ids, postings, by_size = self._get_snapshot()
+        total = len(recipe_ids)
+        slices = []
+        for ingredient_id in set(ingredient_ids):
+            carry = postings.get(ingredient_id, 0)
+            if isinstance(carry, array):
+                carry = to_bitset(carry, total)
+            for bit, value in enumerate(slices):
+                if not carry:
+                    break
+                slices[bit], carry = value ^ carry, value & carry
+            if carry:
+                slices.append(carry)
+        candidates = 0
+        for value in slices:
+            candidates |= value
+        groups = []
+        for count in range(1, 1 << len(slices)):
+            matched = candidates
+            for bit, value in enumerate(slices):
+                matched &= value if count >> bit & 1 else ~value
+            if not matched:
+                continue
+            for size, recipes in by_size.items():
+                coverage = count / size
+                if coverage < min_coverage:
+                    continue
+                bits = matched & recipes
+                if bits:
+                    groups.append((coverage, count, bits))
+        groups.sort(key=lambda group: (group[0], group[1]), reverse=True)
+        return PantryRanking(
+            [(coverage, bits) for coverage, _, bits in groups], recipe_ids
+        )
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,152 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from api.ingredient_search import normalize
+
+# Документ рецепта: название, описание и названия ингредиентов
+DOCUMENT_SQL = '''
+    SELECT r.id, r.name, r.text,
+           COALESCE({group_concat}, '') AS ingredients
+    FROM recipes_recipe r
+    LEFT JOIN recipes_recipeingredient ri ON ri.recipe_id = r.id
+    LEFT JOIN recipes_ingredient i ON i.id = ri.ingredient_id
+    {where}
+    GROUP BY r.id, r.name, r.text
+'''
+SEARCH_TABLE = 'recipes_recipesearch'
+WORD = re.compile(r'\w+')
+
+
+def id_list_sql(ids, column='r.id'):
+    """Условие по списку id рецептов (None - все рецепты)."""
+    if ids is None:
+        return '', []
+    ids = list(ids)
+    return f'WHERE {column} IN ({", ".join(["%s"] * len(ids))})', ids
+
+
+def fold_sql(column):
+    """Замена ё на е в SQLite: регистр FTS5 приводит сам."""
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+class PostgresSearch:
+    """
+    tsvector с весами (название A, описание B, ингредиенты C)
+    под GIN-индексом, русская морфология через конфигурацию 'russian'.
+    """
+    config = 'russian'
+
+    def index(self, ids=None):
+        where, params = id_list_sql(ids)
+        documents = DOCUMENT_SQL.format(
+            group_concat="string_agg(i.name, ' ')", where=where
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                INSERT INTO {SEARCH_TABLE} (recipe_id, document)
+                SELECT d.id,
+                       setweight(to_tsvector(%s, d.name), 'A')
+                       || setweight(to_tsvector(%s, d.text), 'B')
+                       || setweight(to_tsvector(%s, d.ingredients), 'C')
+                FROM ({documents}) d
+                ON CONFLICT (recipe_id)
+                DO UPDATE SET document = EXCLUDED.document
+            ''', [self.config] * 3 + params)
+
+    def delete(self, ids):
+        """Строки индекса удаляются каскадно вместе с рецептом."""
+
+    def match(self, query):
+        return (
+            f'{SEARCH_TABLE}.document @@ websearch_to_tsquery(%s, %s)',
+            [self.config, query]
+        )
+
+    def rank(self, query):
+        return (
+            f'ts_rank({SEARCH_TABLE}.document, '
+            'websearch_to_tsquery(%s, %s))',
+            [self.config, query]
+        )
+
+
+class SQLiteSearch:
+    """
+    Виртуальная таблица FTS5, rowid строки - id рецепта.
+    Морфологии нет: слова запроса ищутся по префиксу.
+    """
+
+    def index(self, ids=None):
+        where, params = id_list_sql(ids)
+        documents = DOCUMENT_SQL.format(
+            group_concat="group_concat(i.name, ' ')", where=where
+        )
+        self.delete(ids)
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                INSERT INTO {SEARCH_TABLE}
+                    (rowid, recipe_id, name, text, ingredients)
+                SELECT d.id, d.id, {fold_sql('d.name')},
+                       {fold_sql('d.text')}, {fold_sql('d.ingredients')}
+                FROM ({documents}) d
+            ''', params)
+
+    def delete(self, ids):
+        where, params = id_list_sql(ids, column='rowid')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} {where}', params)
+
+    def fts_query(self, query):
+        """Слова запроса как префиксы в кавычках: без синтаксиса FTS5."""
+        return ' '.join(
+            f'"{word}"*' for word in WORD.findall(normalize(query))
+        )
+
+    def match(self, query):
+        return f'{SEARCH_TABLE} MATCH %s', [self.fts_query(query)]
+
+    def rank(self, query):
+        # bm25: меньше - лучше; веса столбцов как у A, B, C в PostgreSQL
+        return f'-bm25({SEARCH_TABLE}, 0, 10.0, 4.0, 2.0)', []
+
+
+SEARCH_BACKENDS = {
+    'postgresql': PostgresSearch,
+    'sqlite': SQLiteSearch,
+}
+
+
+def get_backend():
+    return SEARCH_BACKENDS[connection.vendor]()
+
+
+def index_recipes(ids=None):
+    """Обновление документов рецептов в индексе (None - всех)."""
+    get_backend().index(ids)
+
+
+def delete_recipes(ids):
+    """Удаление рецептов из индекса."""
+    get_backend().delete(ids)
+
+
+def search_recipes(queryset, query):
+    """
+    Рецепты, найденные по запросу, с релевантностью search_rank.
+    Таблица индекса присоединяется к рецептам (JOIN), так что
+    условие и релевантность считаются за один проход по индексу.
+    """
+    if not WORD.search(query):
+        return queryset.none()
+    backend = get_backend()
+    return queryset.filter(
+        search_document__isnull=False
+    ).filter(
+        RawSQL(*backend.match(query), output_field=BooleanField())
+    ).annotate(
+        search_rank=RawSQL(*backend.rank(query), output_field=FloatField())
+    ).order_by('-search_rank', '-id')
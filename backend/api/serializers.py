@@ -1,21 +1,24 @@
+from functools import partial
+
 from django.contrib.auth import get_user_model
-from django.http import Http404
-from django.shortcuts import get_object_or_404
-from drf_base64.fields import Base64ImageField
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 
-from api.validators import validate_tags
-from recipes.constants import MIN_AMOUNT_INGREDIENT
+from api.cache import get_relation_ids
+from api.fields import RenditionImageField
+from api.validators import validate_ingredients, validate_tags
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            RecipeShortLink, ShoppingCart, Tag)
-from users.models import Subscription
+                            RecipeShortLink, ShoppingCartIngredient, Tag)
 
 User = get_user_model()
 
 
 class UserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(read_only=True)
-    avatar = serializers.ImageField(required=False, allow_null=True)
+    avatar = RenditionImageField(
+        rendition='avatar', required=False, allow_null=True
+    )
 
     class Meta:
         model = User
@@ -33,36 +36,48 @@ class UserSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         if not user or user.is_anonymous:
             return False
-        return Subscription.objects.filter(user=user, author=obj).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return obj.id in get_relation_ids(user, 'subscriptions')
 
 
 class ShowFavoriteSerializer(serializers.ModelSerializer):
     """Сериализатор укороченной информации о рецепте."""
+    image = RenditionImageField(rendition='card', read_only=True)
+
     class Meta:
         model = Recipe
         fields = ['id', 'name', 'image', 'cooking_time']
         read_only_fields = ('__all__',)
 
 
+def get_recipes_limit(request):
+    """Лимит рецептов автора из параметра recipes_limit."""
+    limit = request.query_params.get('recipes_limit')
+    try:
+        return int(limit) if limit and int(limit) > 0 else None
+    except (ValueError, TypeError):
+        return None
+
+
 class RecipeMixin:
     """Миксин для сериализаторов, работающих с рецептами."""
 
     def get_recipes(self, obj):
         """Функция выдачи рецептов автора с лимитом."""
-        limit = self.context['request'].query_params.get('recipes_limit')
-        queryset = obj.recipes.all()
-        try:
-            limit = int(limit) if limit and int(limit) > 0 else None
-        except (ValueError, TypeError):
-            limit = None
-        if limit:
-            queryset = queryset[:limit]
+        if hasattr(obj, 'recipes_preview'):
+            queryset = obj.recipes_preview
+        else:
+            queryset = obj.recipes.all()
+            limit = get_recipes_limit(self.context['request'])
+            if limit:
+                queryset = queryset[:limit]
         serializer = ShowFavoriteSerializer(queryset, many=True)
         return serializer.data
 
     def get_recipes_count(self, obj):
-        """Функция расчета количества рецептов автора."""
-        return obj.recipes.count()
+        """Количество рецептов автора из счетчика в модели."""
+        return obj.recipes_count
 
 
 class ShortLinkSerializer(serializers.ModelSerializer, RecipeMixin):
@@ -111,17 +126,25 @@ class SubscriptionSerializer(serializers.ModelSerializer, RecipeMixin):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
-        return Subscription.objects.filter(user=user, author=obj).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return obj.id in get_relation_ids(user, 'subscriptions')
 
 
 class AvatarUserSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления/удаления аватара."""
-    avatar = Base64ImageField(required=True)
+    avatar = RenditionImageField(rendition='avatar', required=True)
 
     class Meta:
         model = User
         fields = ('avatar',)
 
+    def update(self, instance, validated_data):
+        """Запись только аватара: остальные поля могут быть из кэша."""
+        instance.avatar = validated_data['avatar']
+        instance.save(update_fields=['avatar'])
+        return instance
+
 
 class TagSerializer(serializers.ModelSerializer):
     """Сериализатор модели Тегов."""
@@ -155,7 +178,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     author = UserSerializer(read_only=True)
     ingredients = serializers.SerializerMethodField()
-    image = Base64ImageField(required=True)
+    image = RenditionImageField(rendition='detail', required=True)
     is_favorited = serializers.SerializerMethodField(
         method_name='get_is_favorited')
     is_in_shopping_cart = serializers.SerializerMethodField(
@@ -178,24 +201,24 @@ class RecipeSerializer(serializers.ModelSerializer):
     read_only_fields = ('author', 'tags', 'ingredients')
 
     def get_ingredients(self, obj):
-        ingredients = RecipeIngredient.objects.filter(recipe=obj)
+        ingredients = obj.recipeingredient_set.all()
         return RecipeIngredientSerializer(ingredients, many=True).data
 
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
-        return Favorite.objects.filter(
-            user=request.user, recipe_id=obj
-        ).exists()
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        return obj.id in get_relation_ids(request.user, 'favorites')
 
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
-        return ShoppingCart.objects.filter(
-            user=request.user, recipe_id=obj
-        ).exists()
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        return obj.id in get_relation_ids(request.user, 'shopping_cart')
 
 
 class AddIngredientRecipeSerializer(serializers.ModelSerializer):
@@ -215,11 +238,10 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
     ingredients = AddIngredientRecipeSerializer(
         many=True, required=True
     )
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
+    tags = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False
     )
-    image = Base64ImageField(required=True)
+    image = RenditionImageField(required=True)
 
     class Meta:
         model = Recipe
@@ -235,44 +257,53 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         ]
 
     def validate(self, data):
-        tags = self.initial_data.get('tags')
-        tags = validate_tags(tags)
-        ingredients = self.initial_data.get('ingredients')
-        if not ingredients:
-            raise serializers.ValidationError({
-                'ingredients': 'Нужен хоть один ингридиент для рецепта'})
-        ingredient_list = []
-        for ingredient_item in ingredients:
+        errors = {}
+        for field, validator in (
+            ('tags', validate_tags),
+            ('ingredients', validate_ingredients),
+        ):
             try:
-                ingredient = get_object_or_404(Ingredient,
-                                               id=ingredient_item['id']
-                                               )
-            except Http404:
-                raise serializers.ValidationError({
-                    'ingredients': ('Убедитесь, что такой '
-                                    'ингредиент существует')
-                })
-            if ingredient in ingredient_list:
-                raise serializers.ValidationError('Ингридиенты должны '
-                                                  'быть уникальными')
-            ingredient_list.append(ingredient)
-            if int(ingredient_item['amount']) < MIN_AMOUNT_INGREDIENT:
-                raise serializers.ValidationError({
-                    'ingredients': ('Убедитесь, что значение количества '
-                                    'ингредиента больше 0')
-                })
-        data['ingredients'] = ingredients
+                data[field] = validator(data.get(field))
+            except serializers.ValidationError as error:
+                errors.update(error.detail)
+        if errors:
+            raise serializers.ValidationError(errors)
         return data
 
     def create_ingredients(self, ingredients, recipe):
-        for ingredient_for_create in ingredients:
-            ingredient = Ingredient.objects.get(id=ingredient_for_create['id'])
-            RecipeIngredient.objects.create(
-                ingredient=ingredient,
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
                 recipe=recipe,
-                amount=ingredient_for_create['amount']
+                ingredient_id=ingredient['id'],
+                amount=ingredient['amount']
             )
+            for ingredient in ingredients
+        )
 
+    def update_ingredients(self, ingredients, recipe):
+        """Изменение состава рецепта только по отличающимся строкам."""
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        existing = RecipeIngredient.objects.filter(recipe=recipe)
+        existing.exclude(ingredient_id__in=amounts).delete()
+        changed = []
+        for row in existing.filter(ingredient_id__in=amounts):
+            amount = amounts.pop(row.ingredient_id)
+            if row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients(
+            [{'id': pk, 'amount': amount} for pk, amount in amounts.items()],
+            recipe
+        )
+        transaction.on_commit(partial(
+            ShoppingCartIngredient.rebuild_for_recipe, recipe.id
+        ))
+
+    @transaction.atomic
     def create(self, validated_data):
         """Создание рецепта."""
         ingredients = validated_data.pop('ingredients')
@@ -283,21 +314,24 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         self.create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Изменение рецепта."""
-        instance.tags.clear()
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        ingredients = validated_data.pop('ingredients', None)
-        self.create_ingredients(ingredients, instance)
-        instance.name = validated_data.pop('name')
-        instance.text = validated_data.pop('text')
-        if validated_data.get('image'):
-            instance.image = validated_data.pop('image')
-        instance.cooking_time = validated_data.pop('cooking_time')
-        instance.save()
-        return instance
+        instance.tags.set(validated_data.pop('tags'))
+        self.update_ingredients(validated_data.pop('ingredients'), instance)
+        return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        instance._prefetched_objects_cache = {}
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            'author',
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
         return RecipeSerializer(instance, context={
             'request': self.context.get('request')
         }).data
@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from api.db_routers import primary
+from recipes.models import RecipeShortLink
+
+
+class LRUCache:
+    """Ограниченный по размеру потокобезопасный LRU-кэш процесса."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+short_links = LRUCache(settings.SHORT_LINK_CACHE_SIZE)
+
+
+def resolve_recipe_id(code):
+    """id рецепта по короткому коду; при попадании в кэш без запроса к БД."""
+    recipe_id = short_links.get(code)
+    if recipe_id is None:
+        with primary():
+            recipe_id = RecipeShortLink.objects.filter(
+                short_link=code
+            ).values_list('recipe_id', flat=True).first()
+        if recipe_id is not None:
+            short_links.set(code, recipe_id)
+    return recipe_id
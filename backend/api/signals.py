@@ -0,0 +1,275 @@
+from functools import partial
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_token, invalidate_user_tokens
+from api.cache import (RELATIONS, author_dependencies, bump_version,
+                       bump_versions, invalidate_relation, recipe_dependencies,
+                       recipe_response_versions, tag_recipes_version)
+from api.counters import COUNTERS, change_counter
+from api.db_routers import check_connections
+from api.images import (AVATAR_RENDITIONS, RECIPE_RENDITIONS, renditions_ready,
+                        schedule_renditions)
+from api.metrics import install_query_recorder
+from api.pantry import PANTRY_VERSION, record_recipe_change
+from api.search import delete_recipes, index_recipes
+from api.short_links import short_links
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            RecipeShortLink, ShoppingCart,
+                            ShoppingCartIngredient, Tag)
+from users.models import User
+
+RELATION_MODELS = {model: name for name, (model, _) in RELATIONS.items()}
+
+MODEL_VERSIONS = {
+    Ingredient: 'ingredients',
+    Tag: 'tags',
+    Recipe: 'recipes',
+    User: 'users',
+}
+
+
+def invalidate_user_relations(sender, instance, **kwargs):
+    """Сброс кэша связей при добавлении и удалении записи."""
+    transaction.on_commit(partial(
+        invalidate_relation, instance.user_id, RELATION_MODELS[sender]
+    ))
+
+
+def invalidate_previous_owner(sender, instance, **kwargs):
+    """Сброс кэша прежнего владельца при изменении существующей записи."""
+    if instance.pk is None:
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list(
+        'user_id', flat=True
+    ).first()
+    if previous is not None and previous != instance.user_id:
+        transaction.on_commit(partial(
+            invalidate_relation, previous, RELATION_MODELS[sender]
+        ))
+
+
+def increment_counter(sender, instance, created, **kwargs):
+    """Увеличение счетчика при добавлении записи."""
+    if created:
+        change_counter(sender, instance, 1)
+
+
+def decrement_counter(sender, instance, **kwargs):
+    """Уменьшение счетчика при удалении записи."""
+    change_counter(sender, instance, -1)
+
+
+def bump_model_version(sender, **kwargs):
+    """
+    Новая версия таблицы после фиксации транзакции: меняет ETag
+    и перестраивает индекс ингредиентов.
+    """
+    transaction.on_commit(partial(bump_version, MODEL_VERSIONS[sender]))
+
+
+def bump_recipe_tags_version(sender, action, **kwargs):
+    """Новая версия рецептов при изменении их тегов."""
+    if action.startswith('post_'):
+        transaction.on_commit(partial(bump_version, 'recipes'))
+
+
+def recipe_tag_slugs(recipe):
+    """Slug тегов рецепта: из prefetch, если теги уже загружены."""
+    tags = getattr(recipe, '_prefetched_objects_cache', {}).get('tags')
+    if tags is not None:
+        return [tag.slug for tag in tags]
+    return list(recipe.tags.values_list('slug', flat=True))
+
+
+def bump_recipe_responses(sender, instance, created=False, **kwargs):
+    """
+    Новые версии кэша ответов: карточка рецепта, списки его автора
+    и тегов, лента. Один раз на сохранение рецепта, автор берется
+    из памяти. У нового рецепта тегов еще нет - их версии сбросит
+    m2m_changed. Строки состава своих сигналов не имеют: состав
+    меняется только вместе с сохранением рецепта.
+    """
+    tag_slugs = () if created else recipe_tag_slugs(instance)
+    transaction.on_commit(partial(bump_versions, recipe_response_versions(
+        instance.pk, instance.author_id, tag_slugs
+    )))
+
+
+def bump_recipe_tag_responses(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    """Версии кэша ответов для тегов, добавленных к рецепту и снятых."""
+    if action not in ('pre_clear', 'post_add', 'post_remove'):
+        return
+    if reverse:
+        recipe_ids = pk_set or set(
+            instance.recipes.values_list('pk', flat=True)
+        )
+        names = {tag_recipes_version(instance.slug)}
+        names |= recipe_dependencies(recipe_ids)
+    else:
+        tags = Tag.objects.filter(pk__in=pk_set) if pk_set else instance.tags
+        names = recipe_response_versions(
+            instance.pk, instance.author_id,
+            tags.values_list('slug', flat=True)
+        )
+    transaction.on_commit(partial(bump_versions, names))
+
+
+def bump_author_responses(sender, instance, created, **kwargs):
+    """Автор в ответах с его рецептами: новые версии после изменения."""
+    if created:
+        return
+    names = author_dependencies(instance.pk)
+    if names:
+        transaction.on_commit(partial(bump_versions, names))
+
+
+def bump_rendition_responses(sender, pk, **kwargs):
+    """
+    Готовые копии меняют URL картинок: новые версии ETag и кэша
+    ответов с рецептом или с рецептами автора.
+    """
+    if sender is Recipe:
+        names = recipe_dependencies([pk])
+    else:
+        names = author_dependencies(pk)
+    names.add(MODEL_VERSIONS[sender])
+    transaction.on_commit(partial(bump_versions, names))
+
+
+def record_pantry_change(sender, instance, **kwargs):
+    """Рецепт в журнал индекса подбора: состав меняется с рецептом."""
+    transaction.on_commit(partial(record_recipe_change, instance.pk))
+
+
+def rebuild_pantry(sender, **kwargs):
+    """
+    Удаление ингредиента снимает его строки из состава рецептов без
+    их сохранения: индекс подбора перестраивается целиком.
+    """
+    transaction.on_commit(partial(bump_version, PANTRY_VERSION))
+
+
+def rebuild_shopping_list(sender, instance, **kwargs):
+    """
+    Пересчет списка покупок в той же транзакции, что и изменение
+    корзины: при ошибке не остается корзины без списка.
+    """
+    ShoppingCartIngredient.rebuild(instance.user_id)
+
+
+def index_recipe(sender, instance, **kwargs):
+    """
+    Обновление поискового документа после фиксации транзакции,
+    когда ингредиенты рецепта уже записаны.
+    """
+    transaction.on_commit(partial(index_recipes, [instance.pk]))
+
+
+def unindex_recipe(sender, instance, **kwargs):
+    """Удаление рецепта из поискового индекса."""
+    transaction.on_commit(partial(delete_recipes, [instance.pk]))
+
+
+def reindex_ingredient_recipes(sender, instance, created, **kwargs):
+    """Переиндексация рецептов с переименованным ингредиентом."""
+    if created:
+        return
+    recipe_ids = list(RecipeIngredient.objects.filter(
+        ingredient=instance
+    ).values_list('recipe_id', flat=True))
+    if recipe_ids:
+        transaction.on_commit(partial(index_recipes, recipe_ids))
+
+
+def evict_short_link(sender, instance, **kwargs):
+    """Удаление кода из кэша коротких ссылок."""
+    short_links.delete(instance.short_link)
+
+
+def record_connection_queries(sender, connection, **kwargs):
+    """Замер SQL на каждом новом соединении с БД."""
+    install_query_recorder(connection)
+
+
+def evict_token(sender, instance, **kwargs):
+    """
+    Сброс кэша токена при выходе (удалении) или перевыпуске: сразу
+    и повторно после фиксации, если параллельный запрос успел
+    закэшировать прежнее состояние.
+    """
+    invalidate_token(instance.key)
+    transaction.on_commit(partial(invalidate_token, instance.key))
+
+
+def evict_user_tokens(sender, instance, created, **kwargs):
+    """
+    Сброс кэша токенов после сохранения пользователя: смена пароля,
+    блокировка и другие изменения сразу видны авторизации.
+    """
+    if not created:
+        invalidate_user_tokens(instance.pk)
+        transaction.on_commit(partial(invalidate_user_tokens, instance.pk))
+
+
+def schedule_recipe_renditions(sender, instance, **kwargs):
+    """Подготовка уменьшенных копий фото рецепта после сохранения."""
+    transaction.on_commit(partial(
+        schedule_renditions, instance.image, RECIPE_RENDITIONS
+    ))
+
+
+def schedule_avatar_renditions(sender, instance, **kwargs):
+    """Подготовка уменьшенной копии аватара после сохранения."""
+    transaction.on_commit(partial(
+        schedule_renditions, instance.avatar, AVATAR_RENDITIONS
+    ))
+
+
+for model in RELATION_MODELS:
+    pre_save.connect(invalidate_previous_owner, sender=model)
+    post_save.connect(invalidate_user_relations, sender=model)
+    post_delete.connect(invalidate_user_relations, sender=model)
+
+for model in MODEL_VERSIONS:
+    post_save.connect(bump_model_version, sender=model)
+    post_delete.connect(bump_model_version, sender=model)
+
+for model in COUNTERS:
+    post_save.connect(increment_counter, sender=model)
+    post_delete.connect(decrement_counter, sender=model)
+
+m2m_changed.connect(bump_recipe_tags_version, sender=Recipe.tags.through)
+m2m_changed.connect(bump_recipe_tag_responses, sender=Recipe.tags.through)
+post_save.connect(bump_recipe_responses, sender=Recipe)
+pre_delete.connect(bump_recipe_responses, sender=Recipe)
+post_save.connect(bump_author_responses, sender=User)
+post_save.connect(record_pantry_change, sender=Recipe)
+post_delete.connect(record_pantry_change, sender=Recipe)
+post_delete.connect(rebuild_pantry, sender=Ingredient)
+post_save.connect(rebuild_shopping_list, sender=ShoppingCart)
+post_delete.connect(rebuild_shopping_list, sender=ShoppingCart)
+post_save.connect(index_recipe, sender=Recipe)
+post_delete.connect(unindex_recipe, sender=Recipe)
+post_save.connect(reindex_ingredient_recipes, sender=Ingredient)
+post_delete.connect(evict_short_link, sender=RecipeShortLink)
+post_save.connect(schedule_recipe_renditions, sender=Recipe)
+post_save.connect(schedule_avatar_renditions, sender=User)
+renditions_ready.connect(bump_rendition_responses, sender=Recipe)
+renditions_ready.connect(bump_rendition_responses, sender=User)
+post_save.connect(evict_token, sender=Token)
+post_delete.connect(evict_token, sender=Token)
+post_save.connect(evict_user_tokens, sender=User)
+
+if settings.METRICS_ENABLED:
+    connection_created.connect(record_connection_queries)
+
+if settings.DB_HEALTH_CHECKS:
+    request_started.connect(check_connections)
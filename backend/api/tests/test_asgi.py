@@ -0,0 +1,85 @@
+from urllib.parse import urlencode
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.handlers.asgi import ASGIHandler
+from rest_framework.authtoken.models import Token
+
+from api.metrics import registry
+from recipes.models import ShoppingCart
+
+pytestmark = [
+    pytest.mark.urls('foodgram.asgi_urls'),
+    pytest.mark.django_db(transaction=True),
+]
+
+
+class ASGIResponse:
+    def __init__(self, messages):
+        start, *body = messages
+        self.status_code = start['status']
+        self.content = b''.join(message.get('body', b'') for message in body)
+
+
+@pytest.fixture
+def asgi_get(user):
+    """
+    GET через ASGIHandler, как под uvicorn: тело ответа, в том числе
+    потоковое, отдается в цикле событий.
+    """
+    token, _ = Token.objects.get_or_create(user=user)
+
+    async def call(path, params):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        await ASGIHandler()({
+            'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': urlencode(params or {}).encode(),
+            'headers': [
+                (b'authorization', f'Token {token.key}'.encode()),
+                (b'host', b'testserver'),
+            ],
+        }, receive, send)
+        return ASGIResponse(messages)
+
+    def get(path, params=None):
+        return async_to_sync(call)(path, params)
+    return get
+
+
+def sql_queries(view):
+    """Сумма наблюдений foodgram_sql_queries по представлению."""
+    return sum(
+        series.sum for (name, labels), series in registry._series.items()
+        if name == 'foodgram_sql_queries' and ('view', view) in labels
+    )
+
+
+@pytest.mark.parametrize('url, view', [
+    ('/api/users/me/', 'api:user-me'),
+    ('/api/recipes/', 'recipes'),
+])
+def test_sql_is_measured_for_sync_and_async_views(asgi_get, url, view):
+    before = sql_queries(view)
+    response = asgi_get(url)
+    assert response.status_code == 200
+    assert sql_queries(view) > before
+
+
+@pytest.mark.parametrize('file_format', ['txt', 'csv', 'json'])
+def test_shopping_cart_download(asgi_get, user, make_user, make_recipe,
+                                file_format):
+    ShoppingCart.objects.create(
+        user=user, recipe=make_recipe(make_user('author'))
+    )
+    response = asgi_get(
+        '/api/recipes/download_shopping_cart/', {'format': file_format}
+    )
+    assert response.status_code == 200
+    assert 'Продукт 0' in response.content.decode()
@@ -0,0 +1,70 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache_key
+
+ME = '/api/users/me/'
+AVATAR = (
+    'data:image/gif;base64,R0lGODlhAQABAIAAAP///wAAACH5BAEAAAAALAAAAAABAAEA'
+    'AAICRAEAOw=='
+)
+
+
+@pytest.fixture
+def token(user_client, user):
+    """Токен пользователя, уже закэшированный первым запросом."""
+    token = Token.objects.get(user=user)
+    assert user_client.get(ME).status_code == 200
+    assert cache.get(token_cache_key(token.key)) is not None
+    return token
+
+
+def test_cache_has_no_password_hash(token, user):
+    assert user.password not in repr(cache.get(token_cache_key(token.key)))
+
+
+def test_logout_stops_authentication(token, user_client,
+                                     django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        assert user_client.post(
+            '/api/auth/token/logout/'
+        ).status_code == 204
+    assert user_client.get(ME).status_code == 401
+
+
+def test_password_change_stops_authentication(
+        token, user_client, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        assert user_client.post('/api/users/set_password/', {
+            'current_password': 'Pass-1234', 'new_password': 'Pass-5678x',
+        }).status_code == 204
+    assert user_client.get(ME).status_code == 401
+
+
+def test_deactivation_stops_authentication(
+        token, user, user_client, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        user.is_active = False
+        user.save()
+    assert user_client.get(ME).status_code == 401
+
+
+def test_cached_user_keeps_password_on_save(token, user, user_client):
+    assert user_client.put('/api/users/me/avatar/', {'avatar': AVATAR},
+                           format='json').status_code == 200
+    assert user_client.delete('/api/users/me/avatar/').status_code == 204
+    user.refresh_from_db()
+    assert user.check_password('Pass-1234')
+
+
+def test_cached_user_keeps_counters_on_save(token, user, make_recipe,
+                                            user_client):
+    # Счетчики меняются после того, как пользователь попал в кэш
+    make_recipe(user, 'first')
+    make_recipe(user, 'second')
+    assert user_client.put('/api/users/me/avatar/', {'avatar': AVATAR},
+                           format='json').status_code == 200
+    assert user_client.delete('/api/users/me/avatar/').status_code == 204
+    user.refresh_from_db()
+    assert user.recipes_count == 2
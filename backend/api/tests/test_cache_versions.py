@@ -0,0 +1,61 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import (author_recipes_version, get_versions, recipe_version,
+                       tag_recipes_version)
+
+
+def patch_recipe(client, recipe, tags, ingredients):
+    return client.patch(f'/api/recipes/{recipe.pk}/', {
+        'tags': [tag.pk for tag in tags],
+        'ingredients': [
+            {'id': ingredient.pk, 'amount': 5} for ingredient in ingredients
+        ],
+    }, format='json')
+
+
+def test_removed_ingredients_do_not_add_queries(author, author_client,
+                                                make_recipe, tags,
+                                                ingredients):
+    # Первый запрос кэширует токен и связи пользователя
+    patch_recipe(author_client, make_recipe(author), tags, ingredients[:1])
+    counts = []
+    for count in (3, 10):
+        recipe = make_recipe(author, name=f'r{count}', count=count)
+        with CaptureQueriesContext(connection) as queries:
+            response = patch_recipe(
+                author_client, recipe, tags, ingredients[:1]
+            )
+        assert response.status_code == 200, response.content
+        counts.append(len(queries))
+    assert counts[0] == counts[1]
+
+
+def test_recipe_save_bumps_response_versions(
+        author, author_client, make_recipe, tags, ingredients,
+        django_capture_on_commit_callbacks):
+    recipe = make_recipe(author)
+    names = [
+        recipe_version(recipe.pk), author_recipes_version(author.pk),
+        *(tag_recipes_version(tag.slug) for tag in tags),
+    ]
+    before = get_versions(names)
+    with django_capture_on_commit_callbacks(execute=True):
+        response = patch_recipe(
+            author_client, recipe, tags[:1], ingredients[:2]
+        )
+    assert response.status_code == 200, response.content
+    after = get_versions(names)
+    assert all(new != old for new, old in zip(after, before))
+
+
+def test_author_change_bumps_tag_versions(
+        author, make_recipe, tags, django_capture_on_commit_callbacks):
+    make_recipe(author)
+    names = [tag_recipes_version(tag.slug) for tag in tags]
+    before = get_versions(names)
+    with django_capture_on_commit_callbacks(execute=True):
+        author.first_name = 'Новое имя'
+        author.save()
+    after = get_versions(names)
+    assert all(new != old for new, old in zip(after, before))
@@ -0,0 +1,10 @@
+from recipes.models import Favorite, Recipe
+
+
+def test_decrement_guards_each_counter(user, make_user, make_recipe):
+    recipe = make_recipe(make_user('author'))
+    favorite = Favorite.objects.create(user=user, recipe=recipe)
+    Recipe.objects.filter(pk=recipe.pk).update(favorites_count=0)
+    favorite.delete()
+    recipe.refresh_from_db()
+    assert (recipe.favorites_count, recipe.popularity) == (0, 0)
@@ -0,0 +1,36 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+from rest_framework import serializers
+
+from api import fields
+from api.fields import decode_base64_file
+
+
+@pytest.fixture
+def png():
+    buffer = io.BytesIO()
+    Image.effect_noise((64, 64), 50).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('chunk_size', [7, 64 * 1024])
+@pytest.mark.parametrize('separator', ['\n', '\r\n', ' '])
+def test_wrapped_base64_is_decoded(png, monkeypatch, chunk_size, separator):
+    monkeypatch.setattr(fields, 'BASE64_CHUNK_SIZE', chunk_size)
+    encoded = base64.b64encode(png).decode()
+    wrapped = separator.join(
+        encoded[offset:offset + 76] for offset in range(0, len(encoded), 76)
+    )
+    upload = decode_base64_file(f'data:image/png;base64,{wrapped}\n')
+    assert upload.read() == png
+    assert upload.size == len(png)
+
+
+def test_truncated_base64_is_rejected(png, monkeypatch):
+    monkeypatch.setattr(fields, 'BASE64_CHUNK_SIZE', 7)
+    encoded = base64.b64encode(png).decode()[:-1]
+    with pytest.raises(serializers.ValidationError):
+        decode_base64_file(f'data:image/png;base64,{encoded}')
@@ -0,0 +1,19 @@
+import pytest
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+@pytest.mark.parametrize('param, model', [
+    ('is_favorited', Favorite),
+    ('is_in_shopping_cart', ShoppingCart),
+])
+def test_relation_filters_on_write_actions(author, author_client,
+                                           make_recipe, param, model):
+    recipe = make_recipe(author)
+    url = f'/api/recipes/{recipe.pk}/?{param}=1'
+    # Без отметки рецепт отфильтрован: 404, а не ошибка без аннотации
+    assert author_client.patch(url, {}, format='json').status_code == 404
+    assert author_client.delete(url).status_code == 404
+    model.objects.create(user=author, recipe=recipe)
+    assert author_client.delete(url).status_code == 204
+    assert not Recipe.objects.filter(pk=recipe.pk).exists()
@@ -0,0 +1,63 @@
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from PIL import Image
+
+from api.images import RECIPE_RENDITIONS, build_renditions, rendition_name
+from recipes.models import Recipe
+
+
+def save_png(recipe):
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 600), 'red').save(buffer, 'PNG')
+    recipe.image.save('photo.png', ContentFile(buffer.getvalue()))
+    return recipe.image.name
+
+
+def test_urls_are_built_without_storage_lookups(make_user, make_recipe,
+                                                anonymous_client,
+                                                monkeypatch):
+    recipe = make_recipe(make_user('author'))
+
+    def exists(self, name):
+        raise AssertionError(f'storage.exists({name!r})')
+
+    monkeypatch.setattr(FileSystemStorage, 'exists', exists)
+    assert anonymous_client.get('/api/recipes/').status_code == 200
+    assert anonymous_client.get(
+        f'/api/recipes/{recipe.id}/'
+    ).status_code == 200
+
+
+def test_rendition_is_served_once_marked(make_user, make_recipe,
+                                         anonymous_client,
+                                         django_capture_on_commit_callbacks):
+    recipe = make_recipe(make_user('author'))
+    name = save_png(recipe)
+    url = f'/api/recipes/{recipe.id}/'
+    assert anonymous_client.get(url).json()['image'].endswith(name)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        build_renditions(
+            Recipe, recipe.id, 'image', recipe.image.storage, name,
+            RECIPE_RENDITIONS
+        )
+    assert Recipe.objects.get(pk=recipe.id).rendered_image == name
+    assert anonymous_client.get(url).json()['image'].endswith(
+        rendition_name(name, 'detail')
+    )
+
+
+def test_new_image_falls_back_to_original(make_user, make_recipe,
+                                          anonymous_client):
+    recipe = make_recipe(make_user('author'))
+    build_renditions(
+        Recipe, recipe.id, 'image', recipe.image.storage, save_png(recipe),
+        RECIPE_RENDITIONS
+    )
+    recipe.refresh_from_db()
+    name = save_png(recipe)
+    assert anonymous_client.get(
+        f'/api/recipes/{recipe.id}/'
+    ).json()['image'].endswith(name)
@@ -0,0 +1,48 @@
+import pytest
+
+
+@pytest.fixture
+def recipes(make_user, make_recipe):
+    author = make_user('author')
+    return [make_recipe(author, name=f'r{number}') for number in range(4)]
+
+
+def test_cursor_pages_by_id(recipes, anonymous_client):
+    response = anonymous_client.get(
+        '/api/recipes/', {'pagination': 'cursor', 'limit': 3}
+    ).json()
+    assert 'count' not in response
+    ids = [recipe['id'] for recipe in response['results']]
+    response = anonymous_client.get(response['next']).json()
+    ids += [recipe['id'] for recipe in response['results']]
+    assert ids == sorted((recipe.id for recipe in recipes), reverse=True)
+
+
+@pytest.mark.parametrize('params', [
+    {'ordering': 'popular'},
+    {'ordering': 'trending'},
+    {'search': 'r1'},
+])
+def test_cursor_is_ignored_for_non_unique_ordering(recipes, anonymous_client,
+                                                   params):
+    response = anonymous_client.get(
+        '/api/recipes/', {'pagination': 'cursor', 'limit': 3, **params}
+    ).json()
+    assert 'count' in response
+
+
+def test_subscriptions_cursor_pages_by_username(user, user_client, make_user,
+                                                subscribe):
+    names = ['dave', 'alice', 'carol', 'bob']
+    for name in names:
+        subscribe(user, make_user(name))
+    response = user_client.get(
+        '/api/users/subscriptions/', {'pagination': 'cursor', 'limit': 3}
+    ).json()
+    assert 'count' not in response
+    assert 'cursor=' in response['next']
+    usernames = [author['username'] for author in response['results']]
+    response = user_client.get(response['next']).json()
+    usernames += [author['username'] for author in response['results']]
+    assert usernames == sorted(names)
+    assert response['next'] is None
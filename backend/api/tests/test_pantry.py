@@ -0,0 +1,62 @@
+import pytest
+from django.core.cache import cache
+
+from api.pantry import CHANGES_KEY, PantryIndex, change_key
+from recipes.models import RecipeIngredient
+
+
+def ranked(index, ingredient_ids):
+    ranking = index.rank(ingredient_ids)
+    return ranking[0:len(ranking)]
+
+
+@pytest.fixture
+def index():
+    return PantryIndex()
+
+
+@pytest.fixture
+def count_builds(index, monkeypatch):
+    builds = []
+    build = index._build
+
+    def counted():
+        builds.append(1)
+        return build()
+
+    monkeypatch.setattr(index, '_build', counted)
+    return builds
+
+
+def test_changed_recipes_update_index_in_place(
+        index, count_builds, make_user, make_recipe, ingredients,
+        django_capture_on_commit_callbacks):
+    author = make_user('author')
+    first = make_recipe(author, 'first', count=3)
+    second = make_recipe(author, 'second', count=5)
+    salt = ingredients[0].id
+    assert ranked(index, [salt]) == [(first.id, 1 / 3), (second.id, 1 / 5)]
+    with django_capture_on_commit_callbacks(execute=True):
+        third = make_recipe(author, 'third', count=1)
+        first.delete()
+        RecipeIngredient.objects.filter(
+            recipe=second, ingredient__in=ingredients[2:]
+        ).delete()
+        second.save()
+    assert ranked(index, [salt]) == [(third.id, 1), (second.id, 1 / 2)]
+    assert len(count_builds) == 1
+
+
+def test_gap_in_change_log_rebuilds_index(
+        index, count_builds, make_user, make_recipe, ingredients,
+        django_capture_on_commit_callbacks):
+    author = make_user('author')
+    make_recipe(author, 'first')
+    ranked(index, [ingredients[0].id])
+    with django_capture_on_commit_callbacks(execute=True):
+        second = make_recipe(author, 'second')
+    cache.delete(change_key(cache.get(CHANGES_KEY)))
+    assert [recipe_id for recipe_id, _ in ranked(
+        index, [ingredients[0].id]
+    )] == [second.id, second.id - 1]
+    assert len(count_builds) == 2
@@ -0,0 +1,74 @@
+import pytest
+
+from recipes.models import RecipeIngredient
+
+# Число запросов к БД не зависит от размера страницы: связи рецептов,
+# авторов и отметки пользователя выбираются пачками на всю страницу.
+RECIPE_LIST_QUERIES = 7
+RECIPE_LIST_ANONYMOUS_QUERIES = 6
+RECIPE_CURSOR_QUERIES = 6
+RECIPE_DETAIL_QUERIES = 6
+SUBSCRIPTIONS_QUERIES = 4
+
+
+@pytest.fixture
+def catalog(user, make_user, make_recipe, subscribe):
+    """Восемь авторов в подписках пользователя, по четыре рецепта."""
+    recipes = []
+    for number in range(8):
+        author = make_user(f'author{number}')
+        subscribe(user, author)
+        recipes += [
+            make_recipe(author, name=f'r{number}-{index}', count=index + 2)
+            for index in range(4)
+        ]
+    return recipes
+
+
+@pytest.mark.parametrize('limit', [1, 6])
+def test_recipe_list_queries(catalog, user_client, limit,
+                             django_assert_max_num_queries):
+    with django_assert_max_num_queries(RECIPE_LIST_QUERIES):
+        response = user_client.get('/api/recipes/', {'limit': limit})
+    assert len(response.json()['results']) == limit
+
+
+@pytest.mark.parametrize('limit', [1, 6])
+def test_recipe_list_anonymous_queries(catalog, anonymous_client, limit,
+                                       django_assert_max_num_queries):
+    with django_assert_max_num_queries(RECIPE_LIST_ANONYMOUS_QUERIES):
+        response = anonymous_client.get('/api/recipes/', {'limit': limit})
+    assert len(response.json()['results']) == limit
+
+
+@pytest.mark.parametrize('limit', [1, 32])
+def test_recipe_cursor_queries(catalog, user_client, limit,
+                               django_assert_max_num_queries):
+    with django_assert_max_num_queries(RECIPE_CURSOR_QUERIES):
+        response = user_client.get(
+            '/api/recipes/', {'pagination': 'cursor', 'limit': limit}
+        )
+    assert len(response.json()['results']) == limit
+
+
+@pytest.mark.parametrize('index', [0, -1])
+def test_recipe_detail_queries(catalog, user_client, index,
+                               django_assert_max_num_queries):
+    recipe = catalog[index]
+    with django_assert_max_num_queries(RECIPE_DETAIL_QUERIES):
+        response = user_client.get(f'/api/recipes/{recipe.pk}/')
+    assert len(response.json()['ingredients']) == (
+        RecipeIngredient.objects.filter(recipe=recipe).count()
+    )
+
+
+@pytest.mark.parametrize('limit', [1, 6])
+def test_subscriptions_queries(catalog, user_client, limit,
+                               django_assert_max_num_queries):
+    with django_assert_max_num_queries(SUBSCRIPTIONS_QUERIES):
+        response = user_client.get(
+            '/api/users/subscriptions/', {'limit': limit, 'recipes_limit': 3}
+        )
+    authors = response.json()['results']
+    assert len(authors) == limit
+    assert all(len(author['recipes']) == 3 for author in authors)
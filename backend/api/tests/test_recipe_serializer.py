@@ -0,0 +1,49 @@
+import pytest
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.fast_serializers import recipe_rows
+from api.serializers import RecipeSerializer
+from api.views import RecipeViewSet
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+@pytest.fixture
+def recipes(user, make_user, make_recipe, subscribe):
+    """Рецепты в избранном, в корзине, с копиями фото и без них."""
+    followed, other = make_user('followed'), make_user('other')
+    subscribe(user, followed)
+    User = type(user)
+    User.objects.filter(pk=followed.pk).update(
+        avatar='user/followed.png', rendered_avatar='user/followed.png'
+    )
+    User.objects.filter(pk=other.pk).update(avatar='user/other.png')
+    recipes = [
+        make_recipe(author, name=f'r{number}', count=number + 1)
+        for number, author in enumerate((followed, other, user, followed))
+    ]
+    Recipe.objects.filter(pk=recipes[0].pk).update(
+        rendered_image=recipes[0].image.name
+    )
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    ShoppingCart.objects.create(user=user, recipe=recipes[1])
+    return recipes
+
+
+@pytest.mark.parametrize('action', ['list', 'retrieve'])
+@pytest.mark.parametrize('authenticated', [False, True])
+def test_read_serializer_matches_drf(recipes, user, action, authenticated):
+    request = Request(RequestFactory().get('/api/recipes/'))
+    if authenticated:
+        request.user = user
+    view = RecipeViewSet(action=action, request=request, format_kwarg=None)
+    queryset = view.get_queryset()
+    renderer = JSONRenderer()
+    expected = renderer.render(RecipeSerializer(
+        list(queryset), many=True, context=view.get_serializer_context()
+    ).data)
+    actual = renderer.render(
+        view.read_serializer(recipe_rows(queryset)).data
+    )
+    assert actual == expected
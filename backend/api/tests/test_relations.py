@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+
+from api import cache as cache_module
+from api.cache import get_relation_ids, invalidate_relation
+from recipes.models import Favorite
+
+
+def test_invalidation_during_load_is_not_lost(user, make_user, make_recipe,
+                                              monkeypatch):
+    author = make_user('author')
+    first, second = make_recipe(author, 'first'), make_recipe(author, 'second')
+    Favorite.objects.create(user=user, recipe=first)
+
+    @contextmanager
+    def write_after_read():
+        yield
+        # Параллельный запрос добавляет рецепт и сбрасывает кэш,
+        # пока этот еще не сохранил прочитанное множество.
+        Favorite.objects.create(user=user, recipe=second)
+        invalidate_relation(user.id, 'favorites')
+
+    monkeypatch.setattr(cache_module, 'primary', write_after_read)
+    assert get_relation_ids(user, 'favorites') == {first.id}
+    monkeypatch.undo()
+    assert get_relation_ids(user, 'favorites') == {first.id, second.id}
+
+
+def test_favorite_checks_follow_writes(user_client, make_user, make_recipe,
+                                       django_capture_on_commit_callbacks):
+    recipe = make_recipe(make_user('author'))
+    url = f'/api/recipes/{recipe.id}/favorite/'
+    for method, expected in (('post', 201), ('post', 400),
+                             ('delete', 204), ('delete', 400)):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = getattr(user_client, method)(url)
+        assert response.status_code == expected
+
+
+def test_writes_are_checked_in_db_not_in_stale_cache(user, user_client,
+                                                     make_user, make_recipe):
+    recipe = make_recipe(make_user('author'))
+    url = f'/api/recipes/{recipe.id}/favorite/'
+    # Записи другого процесса: сброс кэша связей сюда еще не дошел
+    assert get_relation_ids(user, 'favorites') == set()
+    Favorite.objects.create(user=user, recipe=recipe)
+    assert user_client.post(url).status_code == 400
+    assert user_client.delete(url).status_code == 204
+
+    Favorite.objects.create(user=user, recipe=recipe)
+    invalidate_relation(user.id, 'favorites')
+    assert get_relation_ids(user, 'favorites') == {recipe.id}
+    Favorite.objects.filter(user=user).delete()
+    assert user_client.delete(url).status_code == 400
+    assert user_client.post(url).status_code == 201
+
+
+def test_subscribe_checks_follow_writes(user, user_client, make_user,
+                                        django_capture_on_commit_callbacks):
+    author = make_user('author')
+    url = f'/api/users/{author.id}/subscribe/'
+    for method, expected in (('post', 201), ('post', 400),
+                             ('delete', 204), ('delete', 400)):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = getattr(user_client, method)(url)
+        assert response.status_code == expected
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+from django.db import connections
+
+from api.db_routers import REPLICA_DB_ALIAS
+from recipes.models import Favorite, Tag
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    """
+    Вторая БД SQLite - снимок основной на момент вызова: реплика,
+    которая не видит последующих записей.
+    """
+    def snapshot():
+        path = str(tmp_path / 'replica.sqlite3')
+        connections['default'].ensure_connection()
+        target = sqlite3.connect(path)
+        connections['default'].connection.backup(target)
+        target.close()
+        config = {**connections['default'].settings_dict, 'NAME': path}
+        connections.settings[REPLICA_DB_ALIAS] = config
+        settings.DATABASES = {
+            **settings.DATABASES, REPLICA_DB_ALIAS: config
+        }
+
+    yield snapshot
+    if REPLICA_DB_ALIAS in connections.settings:
+        connections[REPLICA_DB_ALIAS].close()
+        del connections[REPLICA_DB_ALIAS]
+        del connections.settings[REPLICA_DB_ALIAS]
+
+
+def favorite_ids(client):
+    response = client.get('/api/recipes/', {'is_favorited': 1})
+    return {recipe['id'] for recipe in response.json()['results']}
+
+
+def test_safe_reads_use_replica_until_client_writes(
+        replica, user, user_client, make_user, make_recipe):
+    author = make_user('author')
+    first, second = make_recipe(author, 'first'), make_recipe(author, 'second')
+    replica()
+    Favorite.objects.create(user=user, recipe=first)
+    # Запись еще не дошла до реплики
+    assert favorite_ids(user_client) == set()
+    assert user_client.post(
+        f'/api/recipes/{second.id}/favorite/'
+    ).status_code == 201
+    # После записи клиент читает с основной БД
+    assert favorite_ids(user_client) == {first.id, second.id}
+
+
+def test_etag_body_is_read_from_primary(replica, tags, anonymous_client):
+    replica()
+    Tag.objects.create(name='Новый', slug='new')
+    response = anonymous_client.get('/api/tags/')
+    assert 'new' in [tag['slug'] for tag in response.json()]
+    assert anonymous_client.get(
+        '/api/tags/', HTTP_IF_NONE_MATCH=response['ETag']
+    ).status_code == 304
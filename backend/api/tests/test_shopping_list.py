@@ -0,0 +1,26 @@
+from recipes.models import ShoppingCartIngredient
+
+
+def shopping_list(user):
+    return dict(ShoppingCartIngredient.objects.filter(
+        user=user
+    ).values_list('ingredient__name', 'amount'))
+
+
+def test_shopping_list_follows_cart_in_same_transaction(
+        user, user_client, make_user, make_recipe):
+    author = make_user('author')
+    first = make_recipe(author, 'first', count=2)
+    second = make_recipe(author, 'second', count=3)
+    for recipe in (first, second):
+        url = f'/api/recipes/{recipe.id}/shopping_cart/'
+        assert user_client.post(url).status_code == 201
+    # Без выполнения on_commit: список пересчитан вместе с корзиной
+    assert shopping_list(user) == {
+        'Продукт 0': 20, 'Продукт 1': 20, 'Продукт 2': 10,
+    }
+    url = f'/api/recipes/{first.id}/shopping_cart/'
+    assert user_client.delete(url).status_code == 204
+    assert shopping_list(user) == {
+        'Продукт 0': 10, 'Продукт 1': 10, 'Продукт 2': 10,
+    }
@@ -0,0 +1,67 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+# Вес одного добавления в рейтинге трендов
+TRENDING_WEIGHTS = {
+    Favorite: 1.0,
+    ShoppingCart: 0.5,
+}
+# Активность старше стольких периодов полураспада не учитывается
+TRENDING_WINDOW_HALF_LIVES = 8
+# Рейтинг ниже порога считается нулевым
+TRENDING_MIN_SCORE = 0.01
+
+
+def compute_trending_scores(now, half_life):
+    """
+    Рейтинг рецептов по затухающей активности за окно.
+    Добавления сгруппированы по часам, в память попадает
+    одна строка на рецепт и час, а не на каждое добавление.
+    """
+    decay = math.log(2) / half_life.total_seconds()
+    since = now - half_life * TRENDING_WINDOW_HALF_LIVES
+    scores = defaultdict(float)
+    for model, weight in TRENDING_WEIGHTS.items():
+        buckets = model.objects.filter(created__gte=since).annotate(
+            hour=TruncHour('created')
+        ).values('recipe_id', 'hour').annotate(
+            total=Count('pk')
+        ).order_by().values_list('recipe_id', 'hour', 'total')
+        for recipe_id, hour, total in buckets.iterator():
+            age = max((now - hour).total_seconds(), 0)
+            scores[recipe_id] += weight * total * math.exp(-decay * age)
+    return {
+        recipe_id: round(score, 4)
+        for recipe_id, score in scores.items()
+        if score >= TRENDING_MIN_SCORE
+    }
+
+
+def refresh_trending(now=None, half_life=None):
+    """Запись изменившихся рейтингов, возвращает число обновленных."""
+    now = now or timezone.now()
+    half_life = half_life or timedelta(
+        hours=settings.TRENDING_HALF_LIFE_HOURS
+    )
+    scores = compute_trending_scores(now, half_life)
+    current = dict(Recipe.objects.filter(
+        trending_score__gt=0
+    ).values_list('pk', 'trending_score'))
+    current.update(Recipe.objects.filter(
+        pk__in=scores.keys() - current.keys()
+    ).values_list('pk', 'trending_score'))
+    changed = [
+        Recipe(pk=pk, trending_score=scores.get(pk, 0))
+        for pk, score in current.items()
+        if scores.get(pk, 0) != score
+    ]
+    Recipe.objects.bulk_update(changed, ['trending_score'], batch_size=1000)
+    return len(changed)
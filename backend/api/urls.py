@@ -2,7 +2,7 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet,
-                    get_short_link)
+                    get_short_link, metrics)
 
 app_name = 'api'
 
@@ -19,4 +19,5 @@ urlpatterns = [
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
     path('recipes/<int:recipe_id>/get-link/', get_short_link, name='get-link'),
+    path('_metrics', metrics, name='metrics'),
 ]
@@ -1,60 +1,77 @@
+from collections import Counter
+
 from rest_framework.validators import ValidationError
 
+from recipes.constants import MIN_AMOUNT_INGREDIENT
 from recipes.models import Ingredient, Tag
 
 
+def find_duplicates(ids):
+    """Повторяющиеся id."""
+    return sorted(pk for pk, count in Counter(ids).items() if count > 1)
+
+
+def find_missing(model, ids):
+    """Отсутствующие в БД id, проверка одним запросом."""
+    existing = set(
+        model.objects.filter(id__in=ids).values_list('id', flat=True)
+    )
+    return sorted(set(ids) - existing)
+
+
+def join_ids(ids):
+    """Список id для сообщения об ошибке."""
+    return ', '.join(map(str, ids))
+
+
 def validate_ingredients(data):
-    """Валидация ингредиентов и количества. """
+    """
+    Валидация ингредиентов и количества.
+    Все ошибки (повторы, отсутствие в БД, количество) сообщаются вместе.
+    """
     if not data:
         raise ValidationError(
-            {'ingredients': ['Обязательное поле.']}
+            {'ingredients': ['Нужен хоть один ингридиент для рецепта.']}
         )
-    if len(data) < 1:
-        raise ValidationError(
-            {'ingredients': ['Не переданы ингредиенты.']}
+    ids = [ingredient['id'] for ingredient in data]
+    errors = []
+    duplicates = find_duplicates(ids)
+    if duplicates:
+        errors.append(
+            f'Ингридиенты должны быть уникальными: {join_ids(duplicates)}.'
+        )
+    missing = find_missing(Ingredient, ids)
+    if missing:
+        errors.append(f'Ингредиентов нет в БД: {join_ids(missing)}.')
+    too_small = [
+        ingredient['id'] for ingredient in data
+        if ingredient['amount'] < MIN_AMOUNT_INGREDIENT
+    ]
+    if too_small:
+        errors.append(
+            'Убедитесь, что значение количества ингредиента больше 0: '
+            f'{join_ids(too_small)}.'
         )
-    unique_ingredient = []
-    for ingredient in data:
-        if not ingredient.get('id'):
-            raise ValidationError(
-                {'ingredients': ['Отсутствует id ингредиента.']}
-            )
-        id = ingredient.get('id')
-        if not Ingredient.objects.filter(id=id).exists():
-            raise ValidationError(
-                {'ingredients': ['Ингредиента нет в БД.']}
-            )
-        if id in unique_ingredient:
-            raise ValidationError(
-                {'ingredients': ['Нельзя дублировать имена ингредиентов.']}
-            )
-        unique_ingredient.append(id)
-        amount = int(ingredient.get('amount'))
-        if amount < 1:
-            raise ValidationError(
-                {'amount': ['Количество не может быть менее 1.']}
-            )
+    if errors:
+        raise ValidationError({'ingredients': errors})
     return data
 
 
 def validate_tags(data):
-    """Валидация тэгов: отсутствие в request, отсутствие в БД."""
+    """Валидация тэгов: отсутствие в request, повторы, отсутствие в БД."""
     if not data:
-        raise ValidationError(
-            {'tags': ['Обязательное поле.']}
-        )
-    if len(data) < 1:
         raise ValidationError(
             {'tags': ['Хотя бы один тэг должен быть указан.']}
         )
-    tags_list = []
-    for tag_name in data:
-        if not Tag.objects.filter(id=tag_name).exists():
-            raise ValidationError(
-                {'tags': ['Тэг отсутствует в БД.']}
-            )
-        if tag_name in tags_list:
-            raise ValidationError('Тэг должен '
-                                  'быть уникальным')
-        tags_list.append(tag_name)
+    errors = []
+    duplicates = find_duplicates(data)
+    if duplicates:
+        errors.append(
+            f'Тэги должны быть уникальными: {join_ids(duplicates)}.'
+        )
+    missing = find_missing(Tag, data)
+    if missing:
+        errors.append(f'Тэгов нет в БД: {join_ids(missing)}.')
+    if errors:
+        raise ValidationError({'tags': errors})
     return data
@@ -1,28 +1,71 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from collections import defaultdict
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Exists, F, OuterRef, Prefetch, Value, Window
+from django.db.models.functions import RowNumber
+from django.http import (Http404, HttpResponse, HttpResponseRedirect,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
-from rest_framework.decorators import action, api_view
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import PageLimitPagination
+from api.cache import (RECIPE_FEED_VERSION, author_recipes_version,
+                       recipe_version, tag_recipes_version)
+from api.exporters import EXPORT_FORMATS
+from api.fast_serializers import RecipeReadSerializer, recipe_rows
+from api.filters import RecipeFilter
+from api.ingredient_search import ingredient_index
+from api.metrics import registry
+from api.mixins import AnonymousCacheMixin, ConditionalGetMixin, MetricsMixin
+from api.pagination import FeedPagination, PageLimitPagination
+from api.pantry import pantry_index
 from api.permissions import IsAuthorAdminAuthenticatedOrReadOnly
 from api.serializers import (AvatarUserSerializer, CreateRecipeSerializer,
                              IngredientSerializer, RecipeSerializer,
                              ShortLinkSerializer, ShowFavoriteSerializer,
-                             SubscriptionSerializer, TagSerializer)
+                             SubscriptionSerializer, TagSerializer,
+                             get_recipes_limit)
+from api.short_links import resolve_recipe_id
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            RecipeShortLink, ShoppingCart, Tag)
+                            RecipeShortLink, ShoppingCart,
+                            ShoppingCartIngredient, Tag)
 from users.models import Subscription, User
 
 
-class UserViewSet(viewsets.GenericViewSet):
+def attach_recipe_previews(authors, limit=None):
+    """
+    Последние рецепты для страницы авторов одним запросом.
+    С лимитом используется ROW_NUMBER() OVER (PARTITION BY author).
+    """
+    recipes = Recipe.objects.filter(author__in=authors)
+    if limit:
+        numbered = recipes.annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=F('id').desc(),
+        ))
+        sql, params = numbered.query.sql_with_params()
+        recipes = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) AS numbered '
+            'WHERE row_number <= %s ORDER BY id DESC',
+            (*params, limit)
+        )
+    previews = defaultdict(list)
+    for recipe in recipes:
+        previews[recipe.author_id].append(recipe)
+    for author in authors:
+        author.recipes_preview = previews[author.id]
+    return authors
+
+
+class UserViewSet(MetricsMixin, viewsets.GenericViewSet):
     """ViewSet модели пользователей"""
     queryset = User.objects.all()
-    pagination_class = PageLimitPagination
+    pagination_class = FeedPagination
 
     @action(detail=False, methods=['put'], url_path='me/avatar',
             permission_classes=[IsAuthenticated])
@@ -47,8 +90,8 @@ class UserViewSet(viewsets.GenericViewSet):
         """Удаление аватара пользователя."""
         user = request.user
         if user.avatar:
-            user.avatar.delete()
-            user.save()
+            user.avatar.delete(save=False)
+            user.save(update_fields=['avatar'])
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'detail': 'Аватар отсутствует.'},
@@ -63,11 +106,13 @@ class UserViewSet(viewsets.GenericViewSet):
     def get_subscriptions(self, request, *args, **kwargs):
         """Просмотр листа подписок пользователя."""
         user = self.request.user
-        author_ids = user.following.values_list('author_id', flat=True)
-        subscriptions = User.objects.filter(id__in=author_ids)
-        list = self.paginate_queryset(subscriptions)
+        subscriptions = User.objects.filter(follower__user=user).annotate(
+            is_subscribed=Value(True),
+        ).order_by('username')
+        authors = self.paginate_queryset(subscriptions)
+        attach_recipe_previews(authors, get_recipes_limit(request))
         serializer = SubscriptionSerializer(
-            list, many=True, context={'request': request}
+            authors, many=True, context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
 
@@ -88,12 +133,15 @@ class UserViewSet(viewsets.GenericViewSet):
                 {'detail': 'Нельзя подписаться на самого себя.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        if Subscription.objects.filter(user=user, author=author).exists():
+        # Проверка по БД, а не по кэшу связей: кэш может отставать
+        _, created = Subscription.objects.get_or_create(
+            user=user, author=author
+        )
+        if not created:
             return Response(
                 {'detail': 'Вы уже подписаны на этого пользователя.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        Subscription.objects.create(user=user, author=author)
         serializer = SubscriptionSerializer(
             author, context={'request': request}
         )
@@ -106,34 +154,55 @@ class UserViewSet(viewsets.GenericViewSet):
         """Отписка от автора."""
         follower = request.user
         author = get_object_or_404(User, pk=pk)
-        subscription = Subscription.objects.filter(
-            user=follower, author=author)
-        if not subscription.exists():
-            return Response({'detail': 'Вы не подписаны на этого автора.'},
-                            status=status.HTTP_400_BAD_REQUEST)
-        del_count, _ = subscription.delete()
+        del_count, _ = Subscription.objects.filter(
+            user=follower, author=author
+        ).delete()
         if del_count:
             return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response({'detail': 'Ошибка удаления подписки.'},
+        return Response({'detail': 'Вы не подписаны на этого автора.'},
                         status=status.HTTP_400_BAD_REQUEST)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(
+    MetricsMixin,
+    ConditionalGetMixin,
+    viewsets.ReadOnlyModelViewSet
+):
     """Отображение тегов."""
     permission_classes = [AllowAny, ]
     pagination_class = None
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
+    etag_resources = ('tags',)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    MetricsMixin,
+    ConditionalGetMixin,
+    viewsets.ReadOnlyModelViewSet
+):
     """Отображение ингредиентов."""
     permission_classes = [AllowAny, ]
     pagination_class = None
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
-    filter_backends = [IngredientFilter, ]
-    search_fields = ['^name', ]
+    etag_resources = ('ingredients',)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(self.search, request)
+
+    def search(self, request):
+        """Поиск по индексу в памяти, без обращения к БД."""
+        name = request.query_params.get('name')
+        try:
+            limit = int(request.query_params.get('limit'))
+        except (TypeError, ValueError):
+            limit = None
+        if limit is not None and limit < 1:
+            limit = None
+        if name is None:
+            return Response(ingredient_index.all()[:limit])
+        return Response(ingredient_index.search(name, limit))
 
 
 class RecipeListMixin:
@@ -144,49 +213,158 @@ class RecipeListMixin:
         """Добавить рецепт(корзина или избранное)."""
         recipe = self.get_object()
         user = request.user
-        if self.model_class.objects.filter(user=user, recipe=recipe).exists():
+        # Проверка по БД, а не по кэшу связей: кэш может отставать
+        _, created = self.model_class.objects.get_or_create(
+            user=user, recipe=recipe
+        )
+        if not created:
             return Response(
                 {'errors': f'Рецепт уже добавлен в {self.action_name}.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        self.model_class.objects.create(user=user, recipe=recipe)
         serializer = ShowFavoriteSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def remove_from_list(self, request, pk=None):
         """Удалить рецепт(корзина или избранное)."""
         recipe = self.get_object()
-        user = request.user
-        if not self.model_class.objects.filter(user=user,
-                                               recipe=recipe).exists():
+        deleted, _ = self.model_class.objects.filter(
+            user=request.user, recipe=recipe
+        ).delete()
+        if not deleted:
             return Response(
                 {'errors': f'Рецепт не был добавлен в {self.action_name}.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        self.model_class.objects.filter(user=user, recipe=recipe).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class RecipeReadMixin:
+    """
+    Список и карточка рецепта через RecipeReadSerializer:
+    строки .values() вместо моделей и полей DRF.
+    """
+
+    def read_serializer(self, rows):
+        return RecipeReadSerializer(
+            rows, request=self.request,
+            rendition=self.get_serializer_context().get(
+                'image_rendition', 'detail'
+            )
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(recipe_rows(queryset))
+        if page is not None:
+            return self.get_paginated_response(self.read_serializer(page).data)
+        return Response(self.read_serializer(recipe_rows(queryset)).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Права на объект для чтения не проверяются: retrieve - только GET,
+        # а IsAuthorAdminAuthenticatedOrReadOnly разрешает его всем.
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        )
+        rows = self.read_serializer(recipe_rows(queryset)[:1]).data
+        if not rows:
+            raise Http404
+        return Response(rows[0])
+
+
 class RecipeViewSet(
+    MetricsMixin,
+    ConditionalGetMixin,
+    AnonymousCacheMixin,
+    RecipeReadMixin,
     RecipeListMixin,
     viewsets.ModelViewSet
 ):
     """ViewSet для рецептов."""
     queryset = Recipe.objects.all()
-    pagination_class = PageLimitPagination
+    pagination_class = FeedPagination
     permission_classes = (IsAuthorAdminAuthenticatedOrReadOnly, )
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
     http_method_names = ['get', 'post', 'patch', 'create', 'delete']
+    etag_resources = ('recipes', 'tags', 'ingredients', 'users')
+    etag_actions = ('retrieve',)
+    etag_per_user = True
+    read_actions = ('list', 'retrieve', 'pantry')
+    # Порядок по популярности и трендам меняется без записи в рецепты
+    cache_bypass_params = ('ordering',)
+
+    def get_queryset(self):
+        """
+        Рецепты с флагами текущего пользователя и связанными данными.
+        Число запросов на страницу списка не зависит от её размера.
+        """
+        queryset = Recipe.objects.all()
+        if self.action not in self.read_actions:
+            return queryset
+        user = self.request.user
+        if user.is_authenticated:
+            authors = User.objects.annotate(is_subscribed=Exists(
+                Subscription.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+            queryset = queryset.annotate(
+                is_favorited=Exists(Favorite.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+                is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+            )
+        else:
+            authors = User.objects.annotate(is_subscribed=Value(False))
+            queryset = queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return queryset.prefetch_related(
+            'tags',
+            Prefetch('author', queryset=authors),
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
+    def get_cache_versions(self, request, **kwargs):
+        """
+        Карточка зависит от своего рецепта, список - от рецептов
+        авторов и тегов из фильтра, без них - от всей ленты.
+        Справочники тегов и ингредиентов входят во все ответы.
+        """
+        names = ['tags', 'ingredients']
+        try:
+            if self.action == 'retrieve':
+                return names + [recipe_version(int(kwargs['pk']))]
+            authors = [
+                int(author) for author in request.query_params.getlist(
+                    'author'
+                )
+            ]
+        except ValueError:
+            return None
+        tags = request.query_params.getlist('tags')
+        names += [author_recipes_version(author) for author in authors]
+        names += [tag_recipes_version(slug) for slug in tags]
+        if not authors and not tags:
+            names.append(RECIPE_FEED_VERSION)
+        return names
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in self.read_actions:
             return RecipeSerializer
         return CreateRecipeSerializer
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context.update({'request': self.request})
+        if self.action in ('list', 'pantry'):
+            context['image_rendition'] = 'card'
         return context
 
     @action(detail=True, methods=['post'],
@@ -219,36 +397,84 @@ class RecipeViewSet(
         self.action_name = 'корзина'
         return self.remove_from_list(request, pk)
 
+    def perform_content_negotiation(self, request, force=False):
+        # В выгрузке списка покупок ?format= задает формат файла.
+        if self.action == 'download_shopping_cart':
+            force = True
+        return super().perform_content_negotiation(request, force)
+
+    @action(detail=False, methods=['get'])
+    def pantry(self, request):
+        """
+        Что приготовить из имеющихся ингредиентов: рецепты по убыванию
+        доли ингредиентов, которые есть в ?ingredients=1,2,3.
+        """
+        try:
+            ingredient_ids = [
+                int(pk)
+                for value in request.query_params.getlist('ingredients')
+                for pk in value.split(',') if pk
+            ]
+            min_coverage = float(
+                request.query_params.get('min_coverage', 0)
+            )
+        except ValueError:
+            return Response(
+                {'ingredients': 'Ожидаются id ингредиентов через запятую.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not ingredient_ids:
+            return Response(
+                {'ingredients': 'Укажите хотя бы один ингредиент.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        paginator = PageLimitPagination()
+        page = paginator.paginate_queryset(
+            pantry_index.rank(ingredient_ids, min_coverage), request, self
+        )
+        rows = {
+            row['id']: row for row in recipe_rows(self.get_queryset().filter(
+                id__in=[recipe_id for recipe_id, _ in page]
+            ))
+        }
+        page = [
+            (rows[recipe_id], coverage)
+            for recipe_id, coverage in page if recipe_id in rows
+        ]
+        data = self.read_serializer([row for row, _ in page]).data
+        for item, (_, coverage) in zip(data, page):
+            item['coverage'] = round(coverage, 2)
+        return paginator.get_paginated_response(data)
+
     @action(detail=False, methods=['get'],
             permission_classes=[IsAuthenticated])
     def download_shopping_cart(self, request):
-        """Скачивание списка покупок в формате TXT."""
-        if not request.user.is_authenticated:
+        """Скачивание списка покупок в формате TXT, CSV, JSON или PDF."""
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in EXPORT_FORMATS:
             return Response(
-                {'detail': 'Пользователь не авторизован.'},
-                status=status.HTTP_401_UNAUTHORIZED
+                {'format': 'Доступные форматы: {}.'.format(
+                    ', '.join(EXPORT_FORMATS))},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        user = self.request.user
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).order_by(
-            'ingredient__name'
-        ).annotate(
-            total_quantity=Sum('amount')
+        exporter, content_type = EXPORT_FORMATS[file_format]
+        items = ShoppingCartIngredient.objects.filter(
+            user=request.user
+        ).order_by('ingredient__name').values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        )
+        # Под ASGI тело потокового ответа читается в цикле событий, где
+        # ORM недоступен: строки выбираются здесь, в потоке представления.
+        rows = (
+            list(items) if isinstance(request._request, ASGIRequest)
+            else items.iterator()
+        )
+        response = StreamingHttpResponse(
+            exporter(rows), content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_cart.{file_format}"'
         )
-        lines = []
-        for item in ingredients:
-            lines.append(
-                f"{item['ingredient__name']} - {item['total_quantity']} "
-                f"{item['ingredient__measurement_unit']}\n"
-            )
-        file_content = "Необходимо купить:\n" + ''.join(lines)
-        response = HttpResponse(file_content, content_type='text/plain')
-        response['Content-Disposition'] = ('attachment;'
-                                           'filename="shopping_cart.txt"')
         return response
 
 
@@ -259,3 +485,22 @@ def get_short_link(request, recipe_id):
     short_link, created = RecipeShortLink.objects.get_or_create(recipe=recipe)
     serializer = ShortLinkSerializer(short_link)
     return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """Метрики процесса в текстовом формате Prometheus."""
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@require_GET
+def resolve_short_link(request, code):
+    """Переход по короткой ссылке на страницу рецепта."""
+    recipe_id = resolve_recipe_id(code)
+    if recipe_id is None:
+        raise Http404('Короткая ссылка не найдена.')
+    return HttpResponseRedirect(f'/recipes/{recipe_id}')
@@ -0,0 +1,99 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import Subscription, User
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(settings, tmp_path):
+    """Свой MEDIA_ROOT и пустой кэш на каждый тест."""
+    settings.MEDIA_ROOT = str(tmp_path)
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def make_user(db):
+    def make(username):
+        return User.objects.create_user(
+            email=f'{username}@example.com', username=username,
+            first_name=username, last_name=username, password='Pass-1234',
+        )
+    return make
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user('reader')
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def author(make_user):
+    return make_user('author')
+
+
+@pytest.fixture
+def author_client(author):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=author)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(
+            name=f'Продукт {number}', measurement_unit='г'
+        )
+        for number in range(10)
+    ]
+
+
+@pytest.fixture
+def make_recipe(tags, ingredients):
+    """Рецепт со всеми тегами и count ингредиентами."""
+    def make(author, name='Рецепт', count=3):
+        recipe = Recipe.objects.create(
+            author=author, name=name, text='Текст', cooking_time=5,
+            image=f'rescipes/image/{name}.gif',
+        )
+        recipe.tags.set(tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in ingredients[:count]
+        )
+        return recipe
+    return make
+
+
+@pytest.fixture
+def subscribe():
+    def make(user, author):
+        return Subscription.objects.create(user=user, author=author)
+    return make
@@ -0,0 +1,14 @@
+from django.urls import path, re_path
+
+from api import async_views
+from foodgram.urls import urlpatterns as sync_urlpatterns
+
+# URL для ASGI: горячие пути чтения - асинхронные представления,
+# остальное как в foodgram.urls.
+urlpatterns = [
+    path('api/tags/', async_views.tag_list),
+    path('api/ingredients/', async_views.ingredient_list),
+    path('api/recipes/', async_views.recipe_list),
+    re_path(r'^api/recipes/(?P<pk>[0-9]+)/$', async_views.recipe_detail),
+    path('s/<str:code>', async_views.short_link),
+] + sync_urlpatterns
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 from dotenv import load_dotenv
 
@@ -35,6 +36,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -43,7 +46,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram.urls'
+# foodgram.asgi подставляет foodgram.asgi_urls с асинхронными представлениями
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', 'foodgram.urls')
 
 TEMPLATES = [
     {
@@ -74,6 +78,13 @@ if DEBUG:
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
+    # Вторая SQLite-база вместо реплики для локальной проверки
+    if os.getenv('SQLITE_REPLICA_NAME'):
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_REPLICA_NAME'),
+            'TEST': {'MIRROR': 'default'},
+        }
 else:
     DATABASES = {
         'default': {
@@ -82,9 +93,71 @@ else:
             'USER': os.getenv('POSTGRES_USER', 'foodgram_user'),
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'foodgram_password'),
             'HOST': os.getenv('DB_HOST', 'localhost'),
-            'PORT': os.getenv('DB_PORT', 5432)
+            'PORT': os.getenv('DB_PORT', 5432),
+            # Постоянные соединения: секунды жизни, 0 - на каждый запрос
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            # Через PgBouncer в режиме transaction серверные курсоры
+            # (QuerySet.iterator()) не переживают границу транзакции.
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv(
+                'DB_PGBOUNCER', 'false'
+            ).lower() in ('true', '1', 'yes'),
+            'OPTIONS': {},
         }
     }
+    # Ограничение времени запроса (мс). PgBouncer должен пропускать
+    # параметр options: ignore_startup_parameters = options.
+    if int(os.getenv('DB_STATEMENT_TIMEOUT', 0)):
+        DATABASES['default']['OPTIONS']['options'] = (
+            f'-c statement_timeout={int(os.getenv("DB_STATEMENT_TIMEOUT"))}'
+        )
+    # Реплика для чтения в безопасных запросах
+    if os.getenv('DB_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.getenv('DB_REPLICA_HOST'),
+            'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+
+DATABASE_ROUTERS = ['api.db_routers.PrimaryReplicaRouter']
+# Сколько секунд после записи клиент читает с основной БД, а не с реплики
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+
+# Потоки для запросов к БД асинхронных представлений под ASGI
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 8))
+
+# Проверка постоянных соединений с БД в начале каждого запроса
+DB_HEALTH_CHECKS = os.getenv('DB_HEALTH_CHECKS', 'false').lower() in (
+    'true', '1', 'yes'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+# Через кэш сбрасываются токены, ETag и ответы: кэш в памяти процесса
+# не увидит сброса из другого воркера
+if (CACHES['default']['BACKEND'].endswith('LocMemCache')
+        and int(os.getenv('GUNICORN_WORKERS', 1)) > 1):
+    raise ImproperlyConfigured(
+        'LocMemCache не общий для воркеров gunicorn: нужен '
+        'CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache '
+        'или GUNICORN_WORKERS=1'
+    )
+
+# Время жизни кэша избранного, корзины и подписок пользователя (сек.)
+RELATIONS_CACHE_TIMEOUT = int(os.getenv('RELATIONS_CACHE_TIMEOUT', 60 * 15))
+
+# Время жизни кэша ответов анонимам (сек.), 0 - кэш выключен
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 60 * 5))
+
+# Время жизни токена авторизации с пользователем в кэше (сек.)
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 60 * 5))
 
 
 # Password validation
@@ -127,6 +200,11 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CSV_DIR = os.path.join(BASE_DIR, 'data')
 
+# Шрифт с кириллицей для выгрузки списка покупок в PDF
+PDF_FONT_PATH = os.getenv(
+    'PDF_FONT_PATH', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -136,7 +214,7 @@ AUTH_USER_MODEL = 'users.User'
 REST_FRAMEWORK = {
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -146,6 +224,35 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
 }
 
+# Максимальный размер страницы: постраничный и курсорный режимы
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 6))
+CURSOR_MAX_PAGE_SIZE = int(os.getenv('CURSOR_MAX_PAGE_SIZE', 100))
+
+# Размер LRU-кэша коротких ссылок в каждом процессе
+SHORT_LINK_CACHE_SIZE = int(os.getenv('SHORT_LINK_CACHE_SIZE', 10000))
+
+# Ограничения загружаемых изображений (рецепты, аватары)
+MAX_UPLOAD_IMAGE_BYTES = int(
+    os.getenv('MAX_UPLOAD_IMAGE_BYTES', 10 * 1024 * 1024)
+)
+MAX_UPLOAD_IMAGE_PIXELS = int(os.getenv('MAX_UPLOAD_IMAGE_PIXELS', 40_000_000))
+# Тело JSON с изображением в base64 на треть больше самого файла
+DATA_UPLOAD_MAX_MEMORY_SIZE = MAX_UPLOAD_IMAGE_BYTES * 4 // 3 + 1024 * 1024
+
+# Период полураспада активности в рейтинге трендов (ч.)
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 48))
+
+# Метрики запросов (/api/_metrics) и журнал медленных запросов
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in (
+    'true', '1', 'yes'
+)
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 500))
+# Сколько SQL-запросов медленного запроса попадает в журнал
+SLOW_REQUEST_MAX_QUERIES = int(os.getenv('SLOW_REQUEST_MAX_QUERIES', 100))
+
+# Число потоков для кодирования уменьшенных копий изображений
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
 DJOSER = {
     'SERIALIZERS': {
         'current_user': 'api.serializers.UserSerializer',
@@ -157,6 +264,8 @@ DJOSER = {
     },
     'HIDE_USERS': False,
     'LOGIN_FIELD': 'email',
+    # Смена пароля удаляет токен: старый перестает действовать сразу
+    'LOGOUT_ON_PASSWORD_CHANGE': True,
 }
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
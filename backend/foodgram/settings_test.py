@@ -0,0 +1,9 @@
+import os
+
+# Тесты идут на SQLite из локальной конфигурации, если не задано иное
+os.environ.setdefault('DEBUG', '1')
+
+from foodgram.settings import *  # noqa: E402,F401,F403
+
+# Быстрое хеширование паролей для тестовых пользователей
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
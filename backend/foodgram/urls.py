@@ -3,9 +3,12 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from api.views import resolve_short_link
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path('s/<str:code>', resolve_short_link, name='short-link'),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
@@ -1,8 +1,11 @@
+from functools import partial
+
 from django.contrib import admin
+from django.db import transaction
 from django.utils.safestring import mark_safe
 
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingCartIngredient, Tag)
 
 
 class RecipeIngredientInline(admin.StackedInline):
@@ -34,6 +37,7 @@ class RecipeAdmin(admin.ModelAdmin):
     search_fields = ('name', 'author__username',
                      'author__email', 'ingredients')
     list_filter = ('author', 'name', 'tags')
+    list_select_related = ('author',)
     ordering = ('-id',)
 
     def image_tag(self, obj):
@@ -44,12 +48,18 @@ class RecipeAdmin(admin.ModelAdmin):
 
     image_tag.short_description = 'Фото рецепта'
 
-    @admin.display(description='Количество в избранных')
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        transaction.on_commit(partial(
+            ShoppingCartIngredient.rebuild_for_recipe, form.instance.id
+        ))
+
+    @admin.display(
+        description='Количество в избранных', ordering='favorites_count'
+    )
     def favorites_count(self, obj):
         """Возвращает количество добавлений рецепта в избранное."""
-        if Favorite.objects.filter(recipe=obj).exists():
-            return Favorite.objects.filter(recipe=obj).count()
-        return 0
+        return obj.favorites_count
 
 
 @admin.register(Ingredient)
@@ -10,4 +10,8 @@ MAX_AMOUNT_INGREDIENT = 666666
 MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 1440
 STRING_FOR_RANDOM = string.ascii_letters + string.digits
-MAX_LENGTH_SHORT_LINK = 3
+MAX_LENGTH_SHORT_LINK = 16
+SHORT_LINK_ALPHABET = string.digits + string.ascii_letters
+# Новые коды начинаются с 4 символов и не совпадают со старыми
+# трехсимвольными шестнадцатеричными кодами.
+SHORT_LINK_OFFSET = len(SHORT_LINK_ALPHABET) ** 3
@@ -1,8 +1,14 @@
 import csv
+import json
+import time
+from collections import Counter
+from itertools import islice
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from api.cache import bump_version
 from recipes.models import Ingredient, Tag
 
 ModelsCSV = {
@@ -15,26 +21,149 @@ EXPECTED_HEADERS = {
     Tag: ['name', 'slug'],
 }
 
+# Поля, по которым строка файла сопоставляется с записью в БД,
+# и поля, которые обновляются у найденной записи.
+NATURAL_KEYS = {
+    Ingredient: ('name', 'measurement_unit'),
+    Tag: ('slug',),
+}
+
+UPDATE_FIELDS = {
+    Ingredient: (),
+    Tag: ('name',),
+}
+
+VERSIONS = {
+    Ingredient: 'ingredients',
+    Tag: 'tags',
+}
+
+
+def read_rows(path, model):
+    """Построчное чтение CSV или JSON-списка объектов."""
+    if path.endswith('.json'):
+        with open(path, mode='r', encoding='utf-8') as json_file:
+            rows = json.load(json_file)
+        for row in rows:
+            if sorted(row) != sorted(EXPECTED_HEADERS[model]):
+                raise CommandError(
+                    f'Неверный формат файла {path}: '
+                    f'неправильные поля объекта {row}.'
+                )
+            yield row
+        return
+    with open(path, mode='r', encoding='utf-8') as csv_file:
+        reader = csv.DictReader(csv_file)
+        if reader.fieldnames != EXPECTED_HEADERS[model]:
+            raise CommandError(
+                f'Неверный формат файла {path}: '
+                f'неправильные заголовки полей.'
+            )
+        yield from reader
+
+
+def batches(rows, size):
+    """Разбиение потока строк на пачки по size."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
 
 class Command(BaseCommand):
-    help = 'Импорт данных из csv файлов'
+    help = (
+        'Импорт справочников ингредиентов и тегов из CSV или JSON. '
+        'Существующие записи обновляются, связанные рецепты не затрагиваются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients',
+            default=f'{settings.CSV_DIR}/{ModelsCSV[Ingredient]}',
+            help='Файл ингредиентов (.csv или .json).'
+        )
+        parser.add_argument(
+            '--tags',
+            default=f'{settings.CSV_DIR}/{ModelsCSV[Tag]}',
+            help='Файл тегов (.csv или .json).'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одной пачке запросов.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Показать изменения без записи в БД.'
+        )
 
     def handle(self, *args, **options):
-        for model, csv_file in ModelsCSV.items():
-            model.objects.all().delete()
-            path_to_file = f'{settings.CSV_DIR}/{csv_file}'
-            print(f'Начат импорт данных из файла {path_to_file}')
-
-            with open(path_to_file, mode='r', encoding='utf-8') as csv_file:
-                reader = csv.DictReader(csv_file)
-                header = reader.fieldnames
-
-                if header != EXPECTED_HEADERS[model]:
-                    raise ValueError(
-                        f'Неверный формат файла {csv_file.name}: '
-                        f'неправильные заголовки полей.'
+        files = {Ingredient: options['ingredients'], Tag: options['tags']}
+        for model, path in files.items():
+            self.stdout.write(f'Начат импорт данных из файла {path}')
+            started = time.monotonic()
+            with transaction.atomic():
+                stats = self.import_model(
+                    model, read_rows(path, model),
+                    options['batch_size'], options['dry_run']
+                )
+                if not options['dry_run'] and (
+                    stats['inserted'] or stats['updated']
+                ):
+                    transaction.on_commit(
+                        lambda name=VERSIONS[model]: bump_version(name)
                     )
-                model.objects.bulk_create(model(**data) for data in reader)
+            elapsed = time.monotonic() - started
+            total = sum(stats.values())
             self.stdout.write(
-                f'Завершен импорт данных в модель {model.__name__}')
+                f'{model.__name__}: добавлено {stats["inserted"]}, '
+                f'обновлено {stats["updated"]}, '
+                f'без изменений {stats["unchanged"]} '
+                f'({total / elapsed if elapsed else total:.0f} строк/с)'
+            )
         self.stdout.write('Импорт всех данных завершен.')
+
+    def import_model(self, model, rows, batch_size, dry_run):
+        stats = Counter(inserted=0, updated=0, unchanged=0)
+        key_fields = NATURAL_KEYS[model]
+        update_fields = UPDATE_FIELDS[model]
+        for batch in batches(rows, batch_size):
+            rows_by_key = {
+                tuple(row[field] for field in key_fields): row
+                for row in batch
+            }
+            lookup = {
+                f'{key_fields[0]}__in': {key[0] for key in rows_by_key}
+            }
+            existing = {
+                tuple(getattr(obj, field) for field in key_fields): obj
+                for obj in model.objects.filter(**lookup)
+            }
+            to_create, to_update = [], []
+            for key, row in rows_by_key.items():
+                obj = existing.get(key)
+                if obj is None:
+                    to_create.append(model(**row))
+                    if dry_run:
+                        self.stdout.write(f'+ {row}')
+                    continue
+                changed = [
+                    field for field in update_fields
+                    if getattr(obj, field) != row[field]
+                ]
+                if not changed:
+                    stats['unchanged'] += 1
+                    continue
+                if dry_run:
+                    self.stdout.write(f'~ {key}: {obj} -> {row}')
+                for field in changed:
+                    setattr(obj, field, row[field])
+                to_update.append(obj)
+            if not dry_run:
+                model.objects.bulk_create(to_create)
+                if to_update:
+                    model.objects.bulk_update(to_update, update_fields)
+            stats['inserted'] += len(to_create)
+            stats['updated'] += len(to_update)
+        return stats
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-17 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_shoppingcartingredient'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipeshortlink',
+            name='short_link',
+            field=models.CharField(blank=True, max_length=16, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.3 on 2026-10-17 05:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes', 'Favorite', 'recipes', 'Recipe', 'recipe', 'favorites_count'),
+    ('recipes', 'ShoppingCart', 'recipes', 'Recipe', 'recipe',
+     'shopping_cart_count'),
+    ('recipes', 'Recipe', 'users', 'User', 'author', 'recipes_count'),
+    ('users', 'Subscription', 'users', 'User', 'author', 'followers_count'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for source_app, source, target_app, target, field, counter in COUNTERS:
+        source = apps.get_model(source_app, source)
+        target = apps.get_model(target_app, target)
+        actual = Coalesce(Subquery(
+            source.objects.filter(**{field: OuterRef('pk')}).order_by(
+            ).values(field).annotate(total=Count('pk')).values('total')
+        ), 0)
+        target.objects.update(**{counter: actual})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_short_link_base62'),
+        ('users', '0004_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество в избранных'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество в корзинах'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
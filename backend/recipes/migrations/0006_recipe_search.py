@@ -0,0 +1,98 @@
+# Полнотекстовый индекс рецептов: таблица с tsvector и GIN-индексом
+# в PostgreSQL, виртуальная таблица FTS5 в SQLite.
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+POSTGRES_FORWARD = (
+    '''
+    CREATE TABLE recipes_recipesearch (
+        recipe_id bigint PRIMARY KEY
+            REFERENCES recipes_recipe (id) ON DELETE CASCADE
+            DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    ''',
+    '''
+    CREATE INDEX recipes_recipesearch_document
+    ON recipes_recipesearch USING gin (document)
+    ''',
+    '''
+    INSERT INTO recipes_recipesearch (recipe_id, document)
+    SELECT d.id,
+           setweight(to_tsvector('russian', d.name), 'A')
+           || setweight(to_tsvector('russian', d.text), 'B')
+           || setweight(to_tsvector('russian', d.ingredients), 'C')
+    FROM (
+        SELECT r.id, r.name, r.text,
+               COALESCE(string_agg(i.name, ' '), '') AS ingredients
+        FROM recipes_recipe r
+        LEFT JOIN recipes_recipeingredient ri ON ri.recipe_id = r.id
+        LEFT JOIN recipes_ingredient i ON i.id = ri.ingredient_id
+        GROUP BY r.id, r.name, r.text
+    ) d
+    ''',
+)
+POSTGRES_BACKWARD = ('DROP TABLE recipes_recipesearch',)
+
+SQLITE_FORWARD = (
+    '''
+    CREATE VIRTUAL TABLE recipes_recipesearch USING fts5(
+        recipe_id UNINDEXED, name, text, ingredients,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    ''',
+    '''
+    INSERT INTO recipes_recipesearch
+        (rowid, recipe_id, name, text, ingredients)
+    SELECT d.id, d.id,
+           replace(replace(d.name, 'ё', 'е'), 'Ё', 'Е'),
+           replace(replace(d.text, 'ё', 'е'), 'Ё', 'Е'),
+           replace(replace(d.ingredients, 'ё', 'е'), 'Ё', 'Е')
+    FROM (
+        SELECT r.id, r.name, r.text,
+               COALESCE(group_concat(i.name, ' '), '') AS ingredients
+        FROM recipes_recipe r
+        LEFT JOIN recipes_recipeingredient ri ON ri.recipe_id = r.id
+        LEFT JOIN recipes_ingredient i ON i.id = ri.ingredient_id
+        GROUP BY r.id, r.name, r.text
+    ) d
+    ''',
+)
+SQLITE_BACKWARD = ('DROP TABLE recipes_recipesearch',)
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def run_statements(direction):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor not in STATEMENTS:
+            return
+        for statement in STATEMENTS[vendor][direction]:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_popularity_trending'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_statements(0), run_statements(1)),
+        migrations.CreateModel(
+            name='RecipeSearchDocument',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='recipes.recipe')),
+            ],
+            options={
+                'db_table': 'recipes_recipesearch',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.3 on 2026-10-17 06:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='favorite',
+            name='recipes_favorite_created',
+        ),
+        migrations.RemoveIndex(
+            model_name='shoppingcart',
+            name='recipes_shoppingcart_created',
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['created', 'recipe'], name='recipes_favorite_activity'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-id'], name='recipe_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeingredient',
+            index=models.Index(fields=['recipe', 'ingredient', 'amount'], name='recipeingredient_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['created', 'recipe'], name='recipes_shoppingcart_activity'),
+        ),
+        # Фильтр по тегам идет от тега к рецептам: индекс в обратном
+        # порядке к уникальному (recipe_id, tag_id) автоматической таблицы
+        migrations.RunSQL(
+            'CREATE INDEX recipes_recipe_tags_tag_recipe '
+            'ON recipes_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX recipes_recipe_tags_tag_recipe',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-17 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='rendered_image',
+            field=models.CharField(blank=True, editable=False, help_text='Имя файла фото, для которого готовы уменьшенные копии', max_length=100, verbose_name='Фото с готовыми копиями'),
+        ),
+    ]
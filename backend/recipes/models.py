@@ -1,15 +1,15 @@
-import uuid
-
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Sum
 
 from recipes.constants import (MAX_AMOUNT_INGREDIENT, MAX_COOKING_TIME,
                                MAX_LENGTH_MEASUREMENT_UNIT,
                                MAX_LENGTH_NAME_INGREDIENT,
                                MAX_LENGTH_NAME_RECIPE, MAX_LENGTH_SHORT_LINK,
                                MAX_LENGTH_TAG, MAX_LENGTH_TEXT_RECIPE,
-                               MIN_AMOUNT_INGREDIENT, MIN_COOKING_TIME)
+                               MIN_AMOUNT_INGREDIENT, MIN_COOKING_TIME,
+                               SHORT_LINK_ALPHABET, SHORT_LINK_OFFSET)
 from users.validators import validate_alfanumeric_content
 
 User = get_user_model()
@@ -82,12 +82,56 @@ class Recipe(models.Model):
         ],
         help_text='Введите время готовки (мин.)'
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Количество в избранных',
+        default=0,
+        editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='Количество в корзинах',
+        default=0,
+        editable=False
+    )
+    popularity = models.PositiveIntegerField(
+        verbose_name='Популярность',
+        help_text='Добавления в избранное и в корзины',
+        default=0,
+        editable=False
+    )
+    trending_score = models.FloatField(
+        verbose_name='Рейтинг в трендах',
+        help_text='Затухающая по времени активность, '
+                  'обновляется командой refresh_trending',
+        default=0,
+        editable=False
+    )
+    rendered_image = models.CharField(
+        verbose_name='Фото с готовыми копиями',
+        help_text='Имя файла фото, для которого готовы уменьшенные копии',
+        max_length=100,
+        blank=True,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-id',)
         default_related_name = 'recipes'
+        indexes = [
+            models.Index(
+                fields=('-popularity', '-id'),
+                name='recipe_popular_idx'
+            ),
+            models.Index(
+                fields=('-trending_score', '-id'),
+                name='recipe_trending_idx'
+            ),
+            models.Index(
+                fields=('author', '-id'),
+                name='recipe_author_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -153,6 +197,13 @@ class RecipeIngredient(models.Model):
         verbose_name_plural = 'Ингредиенты'
         ordering = ('id',)
         unique_together = ('recipe', 'ingredient')
+        indexes = [
+            # Покрывающий индекс для суммирования списка покупок
+            models.Index(
+                fields=('recipe', 'ingredient', 'amount'),
+                name='recipeingredient_amount_idx'
+            ),
+        ]
 
 
 class FavoriteShoppingCart(models.Model):
@@ -168,6 +219,10 @@ class FavoriteShoppingCart(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Рецепт',
     )
+    created = models.DateTimeField(
+        verbose_name='Добавлено',
+        auto_now_add=True,
+    )
 
     class Meta:
         abstract = True
@@ -177,6 +232,12 @@ class FavoriteShoppingCart(models.Model):
                 name='%(app_label)s_%(class)s_unique'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('created', 'recipe'),
+                name='%(app_label)s_%(class)s_activity'
+            )
+        ]
 
     def __str__(self):
         return f'{self.user} >> {self.recipe}'
@@ -200,6 +261,90 @@ class ShoppingCart(FavoriteShoppingCart):
         verbose_name_plural = 'Корзина'
 
 
+class ShoppingCartIngredient(models.Model):
+    """
+    Суммарное количество ингредиентов в корзине пользователя.
+    Пересчитывается при изменении корзины и состава рецептов в ней.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='shopping_list'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+        related_name='+'
+    )
+    amount = models.PositiveIntegerField(verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Ингредиент корзины'
+        verbose_name_plural = 'Ингредиенты корзины'
+        ordering = ('id',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_cart_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} >> {self.ingredient} ({self.amount})'
+
+    @classmethod
+    def rebuild(cls, user_id):
+        """
+        Пересчет списка покупок пользователя по его корзине. Строка
+        пользователя блокируется: параллельные пересчеты одного списка
+        идут по очереди, и второй читает корзину уже после первого.
+        """
+        with transaction.atomic():
+            list(User.objects.select_for_update().filter(
+                pk=user_id
+            ).values_list('pk', flat=True))
+            cls.objects.filter(user_id=user_id).delete()
+            cls.objects.bulk_create(
+                cls(
+                    user_id=user_id,
+                    ingredient_id=row['ingredient_id'],
+                    amount=row['total']
+                )
+                for row in RecipeIngredient.objects.filter(
+                    recipe__shopping_cart__user_id=user_id
+                ).values('ingredient_id').annotate(
+                    total=Sum('amount')
+                ).order_by()
+            )
+
+    @classmethod
+    def rebuild_for_recipe(cls, recipe_id):
+        """Пересчет списков покупок всех, у кого рецепт в корзине."""
+        for user_id in ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True):
+            cls.rebuild(user_id)
+
+
+class RecipeSearchDocument(models.Model):
+    """
+    Строка полнотекстового индекса рецептов.
+    Таблица своя для каждой СУБД и создается миграцией.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        related_name='search_document'
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'recipes_recipesearch'
+
+
 class RecipeShortLink(models.Model):
     """Модель коротких ссылок на рецепты."""
     recipe = models.OneToOneField(
@@ -220,5 +365,14 @@ class RecipeShortLink(models.Model):
         super().save(*args, **kwargs)
 
     def generate_short_link(self):
-        short_link = uuid.uuid4().hex[:MAX_LENGTH_SHORT_LINK]
-        return short_link
+        """
+        Код - id рецепта со смещением в base62: уникален без повторных
+        попыток, длина растет вместе с числом рецептов.
+        """
+        number = self.recipe_id + SHORT_LINK_OFFSET
+        base = len(SHORT_LINK_ALPHABET)
+        digits = []
+        while number:
+            number, remainder = divmod(number, base)
+            digits.append(SHORT_LINK_ALPHABET[remainder])
+        return ''.join(reversed(digits))
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-17 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_subscription_author_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='rendered_avatar',
+            field=models.CharField(blank=True, editable=False, help_text='Имя файла аватара, для которого готова уменьшенная копия', max_length=100, verbose_name='Аватар с готовой копией'),
+        ),
+    ]
@@ -36,6 +36,23 @@ class User(AbstractUser):
         null=True,
         default=None
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False
+    )
+    rendered_avatar = models.CharField(
+        verbose_name='Аватар с готовой копией',
+        help_text='Имя файла аватара, для которого готова уменьшенная копия',
+        max_length=100,
+        blank=True,
+        editable=False
+    )
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
     USERNAME_FIELD = 'email'
 
@@ -76,6 +93,12 @@ class Subscription(models.Model):
                 name='selfsubscription_not_allowed'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('author', 'user'),
+                name='subscription_author_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} подписался на {self.author}'
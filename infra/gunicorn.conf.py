@@ -0,0 +1,27 @@
+# Настройки gunicorn для backend: монтируется в /app/gunicorn.conf.py,
+# gunicorn читает его из рабочего каталога сам.
+#
+# WSGI (по умолчанию): синхронные воркеры, поток на запрос.
+#   GUNICORN_APP=foodgram.wsgi:application
+#   GUNICORN_WORKER_CLASS=sync
+# ASGI: цикл событий uvicorn, медленные клиенты не занимают воркер.
+#   GUNICORN_APP=foodgram.asgi:application
+#   GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0:9090')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+workers = int(
+    os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+)
+# Потоки gthread-воркера; для sync и uvicorn не используются
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Перезапуск воркеров против роста памяти
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+# Пустое значение отключает журнал доступа
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None